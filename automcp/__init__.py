@@ -1,13 +1,26 @@
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from automcp import optimisation, resources, visualise, compute
+from automcp import optimisation, resources, visualise, compute, execution
 from mcp.server.fastmcp import FastMCP
 
 system_dir = Path(__file__).parent / "system"
 
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    # Build the profile finders and examples once the server is running rather than
+    # on import, so the server answers the initialize handshake without waiting for
+    # autolens to import
+    threading.Thread(target=resources.warm, name="automcp-warm", daemon=True).start()
+    yield {}
+
+
 mcp = FastMCP(
     "autolens",
     instructions=(system_dir / "general.txt").read_text(encoding="utf-8"),
+    lifespan=lifespan,
 )
 
 # aggregate.add_tools(mcp)
@@ -15,3 +28,4 @@ mcp = FastMCP(
 # resources.add(mcp)
 visualise.add(mcp)
 compute.add(mcp)
+execution.add(mcp)
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import tempfile
+
 from autoconf.dictable import to_dict
 
 from typing import List
@@ -7,49 +11,309 @@ import json
 from pathlib import Path
 
 from autofit import SearchOutput, AggregateImages, AggregateFITS, FITSFit
-from autofit.aggregator import Aggregator
 from autofit.aggregator.summary.aggregate_images import SubplotFit
 
+from automcp import config, execution
+from automcp.cache import LRUCache, file_signature
+from automcp.search_index import Field, SortBy, search_index, signature
+from automcp.single_flight import single_flight
+
+log = logging.getLogger(__name__)
+
+# Entries are (signature, value, size in bytes)
+model_cache = LRUCache(
+    "model",
+    maxbytes=config.env_int("AUTOMCP_MODEL_CACHE_MB", 64) * 1024**2,
+    sizeof=lambda entry: entry[2],
+)
+
 
 def add_tools(mcp):
     mcp.tool()(list_searches)
     mcp.tool()(get_model_details)
     mcp.tool()(get_model_result)
+    mcp.tool()(get_models_details)
+    mcp.tool()(get_models_results)
     mcp.tool()(combine_images)
     mcp.tool()(combine_fits)
 
 
-async def list_searches(directory: str) -> str:
+def _load_search(directory: Path) -> dict:
+    """
+    Load the metadata of a single search for the index.
+
+    The signature is taken before loading so that a search which is written to while it
+    is being read is loaded again next time.
+    """
+    search_signature = signature(directory)
+    try:
+        search = SearchOutput(directory)
+        name = search.name
+        instance = to_dict(search.instance)
+        log_evidence = search.samples.log_evidence
+    except Exception as e:
+        log.warning("Could not load search %s: %s", directory, e)
+        name, instance, log_evidence = None, None, None
+    return {
+        "directory": str(directory),
+        "signature": search_signature,
+        "name": name,
+        "instance": instance,
+        "log_evidence": log_evidence,
+    }
+
+
+@single_flight
+async def list_searches(
+    directory: str,
+    name: str | None = None,
+    sort_by: SortBy | None = None,
+    descending: bool = True,
+    fields: List[Field] | None = None,
+    offset: int = 0,
+    limit: int | None = None,
+) -> str:
     """
     Get details of all searches in the directory.
+
+    Parameters
+    ----------
+    directory
+        The output directory containing the searches.
+    name
+        Only list searches whose name contains this string.
+    sort_by
+        Sort searches by this field, e.g. log_evidence to rank fits by their evidence.
+        Searches are listed in directory order by default.
+    descending
+        Sort in descending order, e.g. highest evidence first.
+    fields
+        The fields to include for each search. All of name, directory, instance and
+        log_evidence by default.
+    offset
+        The number of searches to skip, for paging through large output directories.
+    limit
+        The maximum number of searches to list.
     """
-    aggregator = Aggregator.from_directory(Path(directory))
+    root = Path(directory).resolve()
+    changed, removed = await asyncio.to_thread(search_index.stale, root)
+    searches = await asyncio.gather(
+        *(execution.run(_load_search, search_directory) for search_directory in changed)
+    )
+    await asyncio.to_thread(search_index.update, list(searches), removed)
     return json.dumps(
-        [
-            {
-                "name": search.name,
-                "directory": str(search.directory),
-                "instance": to_dict(search.instance),
-                "log_evidence": search.samples.log_evidence,
-            }
-            for search in aggregator
-        ]
+        await asyncio.to_thread(
+            search_index.query,
+            root,
+            name=name,
+            sort_by=sort_by,
+            descending=descending,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+        )
     )
 
 
+def _load_model_details(directory: str) -> dict:
+    return SearchOutput(Path(directory)).model.dict()
+
+
+def _load_model_result(directory: str) -> str:
+    with open(Path(directory) / "model.result") as f:
+        return f.read()
+
+
+async def _cached(kind: str, directory: str, files_signature: tuple, load):
+    """
+    Get a value read from a search directory, reading it again on the worker pool if the
+    files it was read from have changed.
+    """
+    key = (kind, str(Path(directory).resolve()))
+    entry = model_cache.get(key)
+    if entry is not None and entry[0] == files_signature:
+        return entry[1]
+
+    value = await execution.run(load, directory)
+    model_cache.put(key, (files_signature, value, len(json.dumps(value))))
+    return value
+
+
+async def _model_details(directory: str) -> dict:
+    path = Path(directory)
+    return await _cached(
+        "details",
+        directory,
+        file_signature(path / "metadata", path / "files" / "model.json"),
+        _load_model_details,
+    )
+
+
+async def _model_result(directory: str) -> str:
+    return await _cached(
+        "result",
+        directory,
+        file_signature(Path(directory) / "model.result"),
+        _load_model_result,
+    )
+
+
+def _select(value, field: str):
+    """
+    Select a field of a nested dictionary by a dot separated path, e.g.
+    'arguments.galaxies'. List items are selected by index.
+    """
+    for part in field.split("."):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    return value
+
+
+async def _for_each(directories: List[str], func) -> dict:
+    """
+    Call func for each directory concurrently, reporting failures per directory rather
+    than failing the whole request.
+    """
+    results = await asyncio.gather(
+        *(func(directory) for directory in directories),
+        return_exceptions=True,
+    )
+    return {
+        directory: (
+            {"error": f"{type(result).__name__}: {result}"}
+            if isinstance(result, Exception)
+            else result
+        )
+        for directory, result in zip(directories, results)
+    }
+
+
 async def get_model_details(directory: str) -> str:
     """
     Get a description of the model that was optimized.
     """
-    return json.dumps(SearchOutput(Path(directory)).model.dict())
+    return json.dumps(await _model_details(directory))
 
 
 async def get_model_result(directory: str) -> str:
     """
     Get a description of the posterior model resultant from the optimization.
     """
-    with open(Path(directory) / "model.result") as f:
-        return f.read()
+    return await _model_result(directory)
+
+
+async def get_models_details(
+    directories: List[str],
+    fields: List[str] | None = None,
+) -> str:
+    """
+    Get descriptions of the models that were optimized by many searches at once.
+
+    Parameters
+    ----------
+    directories
+        The directories containing the searches.
+    fields
+        Dot separated paths of the parts of each model to include, e.g.
+        'arguments.galaxies.arguments.lens'. The whole model by default.
+
+    Returns
+    -------
+    A JSON object mapping each directory to its model, or to an error if it could not
+    be read.
+    """
+
+    async def details(directory: str) -> dict:
+        model = await _model_details(directory)
+        if fields is None:
+            return model
+        return {field: _select(model, field) for field in fields}
+
+    return json.dumps(await _for_each(directories, details))
+
+
+async def get_models_results(directories: List[str]) -> str:
+    """
+    Get descriptions of the posterior models resultant from many optimizations at once.
+
+    Parameters
+    ----------
+    directories
+        The directories containing the searches.
+
+    Returns
+    -------
+    A JSON object mapping each directory to its result, or to an error if it could not
+    be read.
+    """
+    return json.dumps(await _for_each(directories, _model_result))
+
+
+def _extract_image(directory: str, image_names: List[str], path: str):
+    """
+    Extract the combined image of a single search and write it to path.
+
+    Returns
+    -------
+    The size and mode of the image.
+    """
+    image = AggregateImages([SearchOutput(Path(directory))]).extract_image(
+        [SubplotFit[name] for name in image_names],
+    )
+    image.save(path)
+    return image.size, image.mode
+
+
+def _compose_rows(filename: str, paths: List[Path], sizes: list):
+    """
+    Stack the images of each search vertically into a single image, reading one image
+    at a time.
+    """
+    from PIL import Image
+
+    width = max(width for (width, _), _ in sizes)
+    height = sum(height for (_, height), _ in sizes)
+    combined = Image.new(sizes[0][1], (width, height), "white")
+    y = 0
+    for path, ((_, row_height), _) in zip(paths, sizes):
+        with Image.open(path) as row:
+            combined.paste(row, (0, y))
+        path.unlink()
+        y += row_height
+    combined.save(filename)
+
+
+def _extract_fits(directory: str, fits_names: List[str], path: str):
+    """
+    Extract the combined .fits of a single search and write it to path.
+    """
+    AggregateFITS([SearchOutput(Path(directory))]).extract_fits(
+        [FITSFit[name] for name in fits_names]
+    ).writeto(path, overwrite=True)
+
+
+def _append_fits(filename: str, path: Path, first: bool):
+    """
+    Append the HDUs of the .fits of a single search to the combined .fits file.
+
+    The first search creates the file, including its primary HDU. The primary HDUs of
+    later searches are only appended if they contain data.
+    """
+    from astropy.io import fits
+
+    with fits.open(path, memmap=True) as hdus:
+        if first:
+            hdus.writeto(filename, overwrite=True)
+        else:
+            for hdu in hdus:
+                if hdu is hdus[0] and hdu.data is None:
+                    continue
+                fits.append(filename, hdu.data, hdu.header)
+    path.unlink()
 
 
 async def combine_images(
@@ -82,13 +346,20 @@ async def combine_images(
             ChiSquaredMap
             SourcePlaneNoZoom
     """
-    aggregate = AggregateImages(
-        [SearchOutput(Path(directory)) for directory in directories],
-    )
-    Path(filename).parent.mkdir(parents=True, exist_ok=True)
-    aggregate.extract_image(
-        [SubplotFit[name] for name in image_names],
-    ).save(filename)
+    output = Path(filename)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output.parent) as temporary_directory:
+        paths = [
+            Path(temporary_directory) / f"{index}.png"
+            for index in range(len(directories))
+        ]
+        sizes = await asyncio.gather(
+            *(
+                execution.run(_extract_image, directory, image_names, str(path))
+                for directory, path in zip(directories, paths)
+            )
+        )
+        await asyncio.to_thread(_compose_rows, filename, paths, sizes)
 
 
 async def combine_fits(
@@ -112,11 +383,24 @@ async def combine_fits(
             NormalizedResidualMap
             ChiSquaredMap
     """
-    aggregate = AggregateFITS(
-        [SearchOutput(Path(directory)) for directory in directories],
-    )
-    Path(filename).parent.mkdir(parents=True, exist_ok=True)
-    aggregate.extract_fits([FITSFit[name] for name in fits_names]).writeto(
-        filename,
-        overwrite=True,
-    )
+    output = Path(filename)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output.parent) as temporary_directory:
+        paths = [
+            Path(temporary_directory) / f"{index}.fits"
+            for index in range(len(directories))
+        ]
+        extractions = [
+            asyncio.ensure_future(
+                execution.run(_extract_fits, directory, fits_names, str(path))
+            )
+            for directory, path in zip(directories, paths)
+        ]
+        try:
+            # Append each search as soon as it and every search before it are extracted
+            for index, (extraction, path) in enumerate(zip(extractions, paths)):
+                await extraction
+                await asyncio.to_thread(_append_fits, filename, path, index == 0)
+        finally:
+            for extraction in extractions:
+                extraction.cancel()
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+_registry: dict[str, "LRUCache | DiskCache"] = {}
+
+
+class LRUCache:
+    """
+    A thread safe least recently used cache bounded by entry count and/or total size.
+
+    Every cache is registered by name so that its hit and miss counters can be reported
+    with `stats`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int | None = None,
+        maxbytes: int | None = None,
+        sizeof: Callable[[Any], int] | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        name
+            A unique name used to report the cache's statistics.
+        maxsize
+            The maximum number of entries, or None for no limit.
+        maxbytes
+            The maximum total size of the entries in bytes, or None for no limit.
+            Requires sizeof.
+        sizeof
+            A function giving the size in bytes of a value.
+        """
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("sizeof must be given to bound a cache by bytes.")
+
+        self.name = name
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.RLock()
+
+        _registry[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value for a key, marking it as recently used.
+        """
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entries to stay within bounds.
+
+        A value larger than maxbytes is not stored.
+        """
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        with self._lock:
+            self.pop(key)
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self._entries and (
+                (self.maxsize is not None and len(self._entries) > self.maxsize)
+                or (self.maxbytes is not None and self.nbytes > self.maxbytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a key from the cache and return its value.
+        """
+        with self._lock:
+            try:
+                value, size = self._entries.pop(key)
+            except KeyError:
+                return default
+            self.nbytes -= size
+            return value
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Get the value for a key, creating and storing it with factory on a miss.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        """
+        Counters describing how effective the cache has been.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.nbytes,
+        }
+
+
+class DiskCache:
+    """
+    A directory of files named by key, bounded by total size and by age.
+
+    Files are written atomically so the cache can be shared by several processes. The
+    modification time of a file is refreshed when it is read so the least recently used
+    files are evicted first.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: str | Path,
+        maxbytes: int | None = None,
+        max_age: float | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        name
+            A unique name used to report the cache's statistics.
+        directory
+            The directory the files are kept in. It is created if needed.
+        maxbytes
+            The maximum total size of the files in bytes, or None for no limit.
+        max_age
+            The number of seconds after which an unused file is evicted, or None for no limit.
+        """
+        self.name = name
+        self.directory = Path(directory)
+        self.maxbytes = maxbytes
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        _registry[name] = self
+
+    def path_for(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def get(self, key: str, suffix: str) -> Path | None:
+        """
+        The path of the cached file for a key, or None if there is no fresh file.
+        """
+        path = self.path_for(key, suffix)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        if self.max_age is not None and time.time() - stat.st_mtime > self.max_age:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def temporary_path(self, key: str) -> Path:
+        """
+        A unique path in the cache directory to write a file to before committing it.
+
+        The returned path has no suffix.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.directory / f".{key}.{os.getpid()}.{threading.get_ident()}"
+
+    def commit(self, temporary_path: Path, key: str, suffix: str) -> Path:
+        """
+        Atomically move a file written to temporary_path into the cache and evict old files.
+        """
+        path = self.path_for(key, suffix)
+        os.replace(temporary_path, path)
+        self.evict()
+        return path
+
+    def put(self, key: str, suffix: str, data: bytes) -> Path:
+        """
+        Atomically write data to the cached file for a key and evict old files.
+        """
+        temporary_path = self.temporary_path(key)
+        temporary_path.write_bytes(data)
+        return self.commit(temporary_path, key, suffix)
+
+    def evict(self):
+        """
+        Remove files older than max_age, then the least recently used files until the
+        total size is within maxbytes.
+        """
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            oversized = self.maxbytes is not None and total > self.maxbytes
+            if not (expired or oversized):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Counters describing how effective the cache has been.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def stats() -> dict[str, dict]:
+    """
+    Statistics for every cache in this process, keyed by cache name.
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def canonical_hash(obj: Any) -> str:
+    """
+    A stable hash of a JSON-like object which does not depend on the order of dictionary keys.
+
+    Objects that cannot be represented in JSON are hashed by their repr.
+    """
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_signature(*paths: str | Path) -> tuple:
+    """
+    The modification time and size of each file, or None for files that do not exist,
+    used to detect when cached values read from them are stale.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def write_json(path: Path, obj: Any):
+    """
+    Atomically write an object to a JSON file, creating its directory if needed, so
+    that readers never see a partly written file.
+
+    Raises
+    ------
+    OSError
+        If the file cannot be written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}"
+    )
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(temporary_path, path)
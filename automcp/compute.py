@@ -1,16 +1,29 @@
+import asyncio
+import math
+
 import numpy as np
 
-from automcp.schema import Instance, UniformGrid2D
+from automcp import execution, tiling
+from automcp.cache import canonical_hash
+from automcp.encoding import encode_array
+from automcp.lensing import MAPS, LensingMap, lensing_maps_from
+from automcp.schema import ArrayOutput, Instance, UniformGrid2D
+from automcp.single_flight import single_flight
 
 
 def add(mcp):
     mcp.add_tool(compute_deflections)
+    mcp.add_tool(compute_deflections_batch)
+    mcp.add_tool(compute_lensing_maps)
 
 
+@single_flight
 async def compute_deflections(
     instance: Instance,
     grid: UniformGrid2D,
-) -> np.ndarray:
+    output: ArrayOutput | None = None,
+    max_memory_mb: int | None = None,
+) -> np.ndarray | dict:
     """
     Compute the deflections of a given instance at specified grid coordinates.
 
@@ -20,12 +33,189 @@ async def compute_deflections(
         A mass profile or tracer.
     grid
         A grid of coordinates where the deflections are computed.
+    output
+        Optionally, a compact encoding for the result or a .npy file to write it to.
+        Recommended for large grids.
+    max_memory_mb
+        If given the grid is evaluated in tiles using roughly at most this much memory and
+        the deflections are written to a .npy file of shape (*shape_native, 2) and
+        precision output.dtype, at output.path if given. Use this for very large grids.
+        Without output.path the file is written to the temporary directory and is never
+        deleted by the server, so delete it once it has been read. output.encoding and
+        output.compression cannot be used with it.
 
     Returns
     -------
     np.ndarray
-        An array of deflections at the specified grid coordinates.
+        An array of deflections at the specified grid coordinates, or a dictionary
+        describing the encoded array if output or max_memory_mb is given.
     """
-    return instance.instance.deflections_yx_2d_from(
+    if max_memory_mb is not None:
+        output = output or ArrayOutput()
+        # The tiles are streamed into a .npy file, so the result cannot be encoded
+        if output.encoding != "json" or output.compression != "none":
+            raise ValueError(
+                "max_memory_mb writes the deflections to a .npy file, so "
+                "output.encoding and output.compression cannot be used with it."
+            )
+        path = await tiling.evaluate_tiled(
+            instance,
+            grid,
+            "deflections",
+            max_memory_mb,
+            path=output.path,
+            dtype=output.dtype,
+        )
+        return {
+            "path": str(path),
+            "shape": [*grid.shape_native, 2],
+            "dtype": output.dtype,
+        }
+
+    return await execution.run(_compute_deflections, instance, grid, output)
+
+
+def _compute_deflections(
+    instance: Instance,
+    grid: UniformGrid2D,
+    output: ArrayOutput | None = None,
+) -> np.ndarray | dict:
+    deflections = instance.instance.deflections_yx_2d_from(
         grid=grid.instance,
     ).array
+    return encode_array(deflections, output)
+
+
+async def compute_deflections_batch(
+    instances: list[Instance],
+    grids: list[UniformGrid2D],
+    output: ArrayOutput | None = None,
+) -> np.ndarray | dict:
+    """
+    Compute the deflections of many instances and/or grids in a single call.
+
+    If one instance and many grids are given the instance is evaluated on every grid. If many
+    instances and one grid are given every instance is evaluated on the grid. Otherwise the
+    lists must have the same length and each instance is evaluated on the grid at the same
+    position. Every grid must have the same shape_native.
+
+    Parameters
+    ----------
+    instances
+        The mass profiles or tracers.
+    grids
+        The grids of coordinates where the deflections are computed.
+    output
+        Optionally, a compact encoding for the result or a .npy file to write it to.
+        Recommended for large batches.
+
+    Returns
+    -------
+    np.ndarray
+        An array of shape (number of evaluations, number of grid pixels, 2) holding the
+        deflections of each evaluation in order, or a dictionary describing the encoded
+        array if output is given.
+    """
+    if not instances or not grids:
+        raise ValueError("At least one instance and one grid must be given.")
+    if len(instances) == 1:
+        instances = instances * len(grids)
+    elif len(grids) == 1:
+        grids = grids * len(instances)
+    elif len(instances) != len(grids):
+        raise ValueError(
+            "instances and grids must have the same length unless one of them has length 1."
+        )
+    if len({tuple(grid.shape_native) for grid in grids}) > 1:
+        raise ValueError("Every grid must have the same shape_native.")
+
+    # Group evaluations by grid so that each worker builds every grid it needs only once
+    groups: dict[tuple, list[int]] = {}
+    for index, grid in enumerate(grids):
+        key = (tuple(grid.shape_native), grid.pixel_scales)
+        groups.setdefault(key, []).append(index)
+
+    chunk_size = math.ceil(len(instances) / execution.MAX_WORKERS)
+    chunks = [
+        indices[start : start + chunk_size]
+        for indices in groups.values()
+        for start in range(0, len(indices), chunk_size)
+    ]
+
+    results = await asyncio.gather(
+        *(
+            execution.run(
+                _compute_deflections_chunk,
+                [instances[index] for index in chunk],
+                grids[chunk[0]],
+            )
+            for chunk in chunks
+        )
+    )
+
+    stacked = None
+    for chunk, deflections in zip(chunks, results):
+        if stacked is None:
+            stacked = np.empty((len(instances), *deflections.shape[1:]))
+        stacked[chunk] = deflections
+    return await asyncio.to_thread(encode_array, stacked, output)
+
+
+def _compute_deflections_chunk(
+    instances: list[Instance],
+    grid: UniformGrid2D,
+) -> np.ndarray:
+    return np.stack(
+        [_compute_deflections(instance, grid) for instance in instances],
+    )
+
+
+async def compute_lensing_maps(
+    instance: Instance,
+    grid: UniformGrid2D,
+    maps: list[LensingMap] | None = None,
+    output: ArrayOutput | None = None,
+) -> dict:
+    """
+    Compute the deflections, convergence, potential and magnification of a given instance
+    on a grid together.
+
+    The deflections are evaluated once and the convergence and magnification are derived
+    from them, which is much faster than computing each map separately.
+
+    Parameters
+    ----------
+    instance
+        A mass profile or tracer.
+    grid
+        A grid of coordinates where the maps are computed.
+    maps
+        The maps to compute, in order. All of deflections_y, deflections_x, convergence,
+        potential and magnification by default.
+    output
+        Optionally, a compact encoding for the result or a .npy file to write it to.
+
+    Returns
+    -------
+    A dictionary with the names of the maps under 'maps' and an array of shape
+    (number of maps, *shape_native) holding them in the same order under 'values', or a
+    dictionary describing the encoded array if output is given.
+    """
+    maps = list(maps or MAPS)
+    values = await execution.run(_compute_lensing_maps, instance, grid, maps, output)
+    return {"maps": maps, "values": values}
+
+
+def _compute_lensing_maps(
+    instance: Instance,
+    grid: UniformGrid2D,
+    maps: list[LensingMap],
+    output: ArrayOutput | None = None,
+) -> np.ndarray | dict:
+    lensing_maps = lensing_maps_from(
+        canonical_hash(instance.model_dump()),
+        instance.instance,
+        grid,
+        maps,
+    )
+    return encode_array(np.stack([lensing_maps[name] for name in maps]), output)
@@ -0,0 +1,36 @@
+import os
+
+
+def env_str(name: str, default: str) -> str:
+    """
+    Read a string setting from the environment.
+
+    Parameters
+    ----------
+    name
+        The name of the environment variable, e.g. AUTOMCP_EXECUTOR.
+    default
+        The value used when the variable is not set or is empty.
+    """
+    value = os.environ.get(name, "").strip()
+    return value or default
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment.
+
+    Parameters
+    ----------
+    name
+        The name of the environment variable, e.g. AUTOMCP_WORKERS.
+    default
+        The value used when the variable is not set or is empty.
+    """
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
@@ -0,0 +1,268 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from automcp import config
+from automcp.cache import LRUCache, canonical_hash, file_signature
+
+DATASET_FILES = ("data.fits", "noise_map.fits", "psf.fits")
+
+# Bytes held per image pixel by an Imaging once its over-sampled grids have been built.
+# Rough, but much closer than counting the data, noise map and PSF alone.
+BYTES_PER_PIXEL = 3 * 8 + 2 * 2 * 8 * 4**2
+
+
+def imaging_nbytes(dataset) -> int:
+    """
+    An estimate of the memory held by an imaging dataset and its over-sampled grids.
+    """
+    return dataset.data.shape_slim * BYTES_PER_PIXEL + dataset.psf.shape_slim * 8
+
+
+def _imaging_nbytes(entry) -> int:
+    signature, dataset = entry
+    return imaging_nbytes(dataset)
+
+
+dataset_cache = LRUCache(
+    "dataset",
+    maxbytes=config.env_int("AUTOMCP_DATASET_CACHE_MB", 1024) * 1024**2,
+    sizeof=_imaging_nbytes,
+)
+
+
+def _signature(dataset_path: Path) -> tuple:
+    """
+    The modification time and size of every file in the dataset, used to detect changes.
+    """
+    return file_signature(*(dataset_path / filename for filename in DATASET_FILES))
+
+
+# Entries are (signature, hash)
+hash_cache = LRUCache(
+    "dataset_hash",
+    maxsize=config.env_int("AUTOMCP_DATASET_HASH_CACHE_SIZE", 256),
+)
+
+
+def content_hash(dataset_path: str | Path) -> str:
+    """
+    A hash of the contents of the files of the dataset in a directory, which identifies
+    the dataset wherever it is stored.
+
+    The hash is only recomputed when a file's modification time or size changes.
+    """
+    dataset_path = Path(dataset_path).resolve()
+    signature = _signature(dataset_path)
+
+    entry = hash_cache.get(str(dataset_path))
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    digest = hashlib.sha256()
+    for filename in DATASET_FILES:
+        digest.update(filename.encode("utf-8"))
+        with open(dataset_path / filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1024**2), b""):
+                digest.update(chunk)
+    content_hash = digest.hexdigest()
+    hash_cache.put(str(dataset_path), (signature, content_hash))
+    return content_hash
+
+
+def _read_fits(path: Path) -> np.ndarray:
+    """
+    Read the primary HDU of a .fits file.
+
+    The file is memory mapped so only the HDU that is needed is read, and the data is
+    converted to native byte order in a single copy.
+    """
+    from astropy.io import fits
+
+    with fits.open(path, memmap=True) as hdul:
+        return np.array(hdul[0].data, dtype=np.float64)
+
+
+def _load_imaging(dataset_path: Path, pixel_scales: float) -> "al.Imaging":
+    import autolens as al
+
+    return al.Imaging(
+        data=al.Array2D.no_mask(
+            values=_read_fits(dataset_path / "data.fits"),
+            pixel_scales=pixel_scales,
+        ),
+        noise_map=al.Array2D.no_mask(
+            values=_read_fits(dataset_path / "noise_map.fits"),
+            pixel_scales=pixel_scales,
+        ),
+        psf=al.Kernel2D.no_mask(
+            values=_read_fits(dataset_path / "psf.fits"),
+            pixel_scales=pixel_scales,
+        ),
+    )
+
+
+def load_imaging(dataset_path: str | Path, pixel_scales: float = 0.1) -> "al.Imaging":
+    """
+    Load the imaging dataset in a directory, reusing a previously loaded copy if the
+    files have not changed.
+
+    Datasets are held in a process wide least recently used cache bounded by
+    AUTOMCP_DATASET_CACHE_MB. The returned dataset is shared so it must not be modified.
+
+    Parameters
+    ----------
+    dataset_path
+        The path to a directory containing 'data.fits', 'noise_map.fits' and 'psf.fits'.
+    pixel_scales
+        The arc-second size of each pixel.
+    """
+    dataset_path = Path(dataset_path).resolve()
+    key = (str(dataset_path), pixel_scales)
+    signature = _signature(dataset_path)
+
+    entry = dataset_cache.get(key)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    dataset = _load_imaging(dataset_path, pixel_scales)
+    dataset_cache.put(key, (signature, dataset))
+    return dataset
+
+
+def _crop(array: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """
+    Crop an array to a shape about its centre.
+    """
+    rows, columns = shape
+    if rows > array.shape[0] or columns > array.shape[1]:
+        raise ValueError(
+            f"Cannot crop an image of shape {array.shape} to the larger shape {shape}."
+        )
+    y0 = (array.shape[0] - rows) // 2
+    x0 = (array.shape[1] - columns) // 2
+    return array[y0 : y0 + rows, x0 : x0 + columns]
+
+
+def _bin(
+    data: np.ndarray, noise_map: np.ndarray, factor: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Bin the data and noise map by a factor in each direction, trimming the edges so the
+    shape is a multiple of the factor.
+
+    The data is averaged and the noise is combined in quadrature.
+    """
+    rows, columns = (length // factor for length in data.shape)
+    if rows == 0 or columns == 0:
+        raise ValueError(
+            f"Cannot bin an image of shape {data.shape} by a factor of {factor}."
+        )
+    shape = (rows, factor, columns, factor)
+    data = _crop(data, (rows * factor, columns * factor)).reshape(shape)
+    noise_map = _crop(noise_map, (rows * factor, columns * factor)).reshape(shape)
+    return (
+        data.mean(axis=(1, 3)),
+        np.sqrt((noise_map**2).sum(axis=(1, 3))) / factor**2,
+    )
+
+
+def _prepare_imaging(
+    dataset_path: Path,
+    pixel_scales: float,
+    crop_shape: tuple[int, int] | None,
+    bin_factor: int,
+    mask_radius: float | None,
+    mask_inner_radius: float | None,
+    over_sample_size: int | None,
+) -> "al.Imaging":
+    import autolens as al
+
+    data = _read_fits(dataset_path / "data.fits")
+    noise_map = _read_fits(dataset_path / "noise_map.fits")
+    psf = al.Kernel2D.no_mask(
+        values=_read_fits(dataset_path / "psf.fits"),
+        pixel_scales=pixel_scales,
+    )
+
+    if crop_shape is not None:
+        data = _crop(data, crop_shape)
+        noise_map = _crop(noise_map, crop_shape)
+    if bin_factor > 1:
+        data, noise_map = _bin(data, noise_map, bin_factor)
+        pixel_scales *= bin_factor
+        psf = psf.rescaled_with_odd_dimensions_from(
+            rescale_factor=1 / bin_factor, normalize=True
+        )
+
+    dataset = al.Imaging(
+        data=al.Array2D.no_mask(values=data, pixel_scales=pixel_scales),
+        noise_map=al.Array2D.no_mask(values=noise_map, pixel_scales=pixel_scales),
+        psf=psf,
+    )
+
+    if mask_radius is not None:
+        if mask_inner_radius is None:
+            mask = al.Mask2D.circular(
+                shape_native=dataset.shape_native,
+                pixel_scales=pixel_scales,
+                radius=mask_radius,
+            )
+        else:
+            mask = al.Mask2D.circular_annular(
+                shape_native=dataset.shape_native,
+                pixel_scales=pixel_scales,
+                inner_radius=mask_inner_radius,
+                outer_radius=mask_radius,
+            )
+        dataset = dataset.apply_mask(mask=mask)
+
+    if over_sample_size is not None:
+        dataset = dataset.apply_over_sampling(over_sample_size_lp=over_sample_size)
+
+    return dataset
+
+
+def prepare_imaging(dataset_path: str | Path, options: dict) -> "al.Imaging":
+    """
+    Load the imaging dataset in a directory and crop, bin, mask and over-sample it,
+    reusing a previously prepared copy if the files and options have not changed.
+
+    Prepared datasets are held in the same cache as those returned by load_imaging.
+    The returned dataset is shared so it must not be modified.
+
+    Parameters
+    ----------
+    dataset_path
+        The path to a directory containing 'data.fits', 'noise_map.fits' and 'psf.fits'.
+    options
+        The fields of a DatasetOptions.
+    """
+    if (
+        options.get("crop_shape") is None
+        and options.get("bin_factor", 1) == 1
+        and options.get("mask_radius") is None
+        and options.get("over_sample_size") is None
+    ):
+        return load_imaging(dataset_path, options.get("pixel_scales", 0.1))
+
+    dataset_path = Path(dataset_path).resolve()
+    key = (str(dataset_path), canonical_hash(options))
+    signature = _signature(dataset_path)
+
+    entry = dataset_cache.get(key)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    dataset = _prepare_imaging(
+        dataset_path,
+        pixel_scales=options.get("pixel_scales", 0.1),
+        crop_shape=options.get("crop_shape"),
+        bin_factor=options.get("bin_factor", 1),
+        mask_radius=options.get("mask_radius"),
+        mask_inner_radius=options.get("mask_inner_radius"),
+        over_sample_size=options.get("over_sample_size"),
+    )
+    dataset_cache.put(key, (signature, dataset))
+    return dataset
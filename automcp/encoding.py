@@ -0,0 +1,83 @@
+import base64
+import io
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from automcp.schema import ArrayOutput
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(data)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package.")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def npy_path(path: str | Path) -> Path:
+    """
+    The path a .npy file is written to, adding the '.npy' suffix if it is missing as
+    np.save does.
+    """
+    path = Path(path)
+    return path if path.suffix == ".npy" else path.with_name(f"{path.name}.npy")
+
+
+def encode_array(array: np.ndarray, output: ArrayOutput | None = None):
+    """
+    Encode an array returned by a tool as requested by the caller.
+
+    Parameters
+    ----------
+    array
+        The array to encode.
+    output
+        How the array should be returned. By default the array is returned unchanged and is
+        sent as nested lists of numbers.
+
+    Returns
+    -------
+    The array itself for the 'json' encoding, otherwise a dictionary describing the
+    encoded array.
+    """
+    if output is None:
+        return array
+
+    array = np.asarray(array, dtype=output.dtype)
+
+    if output.path is not None:
+        path = npy_path(output.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, array)
+        return {
+            "path": str(path),
+            "shape": list(array.shape),
+            "dtype": output.dtype,
+        }
+
+    if output.encoding == "json":
+        return array
+
+    if output.encoding == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        data = buffer.getvalue()
+    else:
+        data = np.ascontiguousarray(array).tobytes()
+
+    return {
+        "encoding": output.encoding,
+        "compression": output.compression,
+        "shape": list(array.shape),
+        "dtype": output.dtype,
+        "data": base64.b64encode(_compress(data, output.compression)).decode("ascii"),
+    }
@@ -0,0 +1,278 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Literal
+
+from automcp import cache, config, single_flight
+
+ExecutorKind = Literal["process", "thread"]
+Pool = Literal["default", "render"]
+
+EXECUTOR_KIND: ExecutorKind = config.env_str("AUTOMCP_EXECUTOR", "process")
+MAX_WORKERS = config.env_int("AUTOMCP_WORKERS", os.cpu_count() or 1)
+RENDER_WORKERS = config.env_int("AUTOMCP_RENDER_WORKERS", min(4, os.cpu_count() or 1))
+# Render workers are replaced after this many renders to limit memory growth
+RENDERS_PER_WORKER = config.env_int("AUTOMCP_RENDERS_PER_WORKER", 200)
+START_METHOD = config.env_str("AUTOMCP_START_METHOD", "spawn")
+
+_executors: dict[str, Executor] = {}
+
+# The latest cache statistics reported by each live worker process, keyed by its id
+_worker_stats: dict[int, dict[str, dict]] = {}
+# The counters of worker processes which have exited, e.g. recycled render workers or the
+# workers of a broken pool, summed by cache name
+_retired_stats: dict[str, dict[str, int]] = {}
+# Statistics describing what a cache holds now rather than counting events, so they are
+# not kept once a worker has exited
+GAUGES = ("entries", "bytes")
+
+
+def add(mcp):
+    mcp.add_tool(get_cache_stats)
+
+
+def _warm_worker():
+    """
+    Import the heavy libraries once when a worker process starts so that the first
+    task sent to it does not pay for the import.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    import autolens  # noqa: F401
+
+
+def _warm_render_worker():
+    """
+    Prepare a rendering worker process. rendering is imported here rather than by the
+    server, as importing it loads matplotlib and the autolens plotting modules.
+    """
+    from automcp import rendering
+
+    rendering.warm()
+
+
+def configure(
+    kind: ExecutorKind | None = None,
+    max_workers: int | None = None,
+    render_workers: int | None = None,
+    renders_per_worker: int | None = None,
+):
+    """
+    Configure the executors used to run blocking tool work.
+
+    Any existing executors are shut down and new ones are created on next use.
+
+    Parameters
+    ----------
+    kind
+        'process' to run work in pools of worker processes or 'thread' to run it in
+        pools of threads. Threads are only useful where the work releases the GIL.
+    max_workers
+        The number of workers in the default pool.
+    render_workers
+        The number of workers in the pool used for plotting.
+    renders_per_worker
+        The number of renders after which a rendering worker process is replaced.
+    """
+    global EXECUTOR_KIND, MAX_WORKERS, RENDER_WORKERS, RENDERS_PER_WORKER
+
+    if kind is not None:
+        if kind not in ("process", "thread"):
+            raise ValueError("kind must be either 'process' or 'thread'.")
+        EXECUTOR_KIND = kind
+    for name, value in (
+        ("max_workers", max_workers),
+        ("render_workers", render_workers),
+        ("renders_per_worker", renders_per_worker),
+    ):
+        if value is not None and value < 1:
+            raise ValueError(f"{name} must be at least 1.")
+    if max_workers is not None:
+        MAX_WORKERS = max_workers
+    if render_workers is not None:
+        RENDER_WORKERS = render_workers
+    if renders_per_worker is not None:
+        RENDERS_PER_WORKER = renders_per_worker
+
+    shutdown()
+
+
+def _create_executor(pool: Pool) -> Executor:
+    if EXECUTOR_KIND == "thread":
+        return ThreadPoolExecutor(
+            # pyplot keeps global state, so plotting must not happen on several threads
+            max_workers=MAX_WORKERS if pool == "default" else 1,
+            thread_name_prefix=f"automcp-{pool}",
+        )
+    if EXECUTOR_KIND != "process":
+        raise ValueError(
+            f"AUTOMCP_EXECUTOR must be either 'process' or 'thread', got {EXECUTOR_KIND!r}"
+        )
+
+    mp_context = multiprocessing.get_context(START_METHOD)
+    if pool == "render":
+        return ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS,
+            mp_context=mp_context,
+            initializer=_warm_render_worker,
+            max_tasks_per_child=RENDERS_PER_WORKER,
+        )
+    return ProcessPoolExecutor(
+        max_workers=MAX_WORKERS,
+        mp_context=mp_context,
+        initializer=_warm_worker,
+    )
+
+
+def get_executor(pool: Pool = "default") -> Executor:
+    """
+    Get the executor for a pool, creating it on first use.
+
+    Parameters
+    ----------
+    pool
+        'default' for general work or 'render' for plotting, which runs in its own pool
+        of pre-warmed workers.
+    """
+    if pool not in _executors:
+        _executors[pool] = _create_executor(pool)
+    return _executors[pool]
+
+
+def discard_broken(pool: Pool, executor: Executor):
+    """
+    Forget an executor whose worker process died, e.g. killed for running out of memory.
+
+    A broken process pool fails every call, so a new one is created on next use.
+    """
+    if _executors.get(pool) is executor:
+        del _executors[pool]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    """
+    Shut down every executor, waiting for running work to finish.
+    """
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def run(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking function in the default worker pool without blocking the event loop.
+
+    The function and its arguments must be picklable when the process executor is used.
+
+    Parameters
+    ----------
+    func
+        A module level function doing the blocking work.
+    args
+        Positional arguments passed to the function.
+    kwargs
+        Keyword arguments passed to the function.
+
+    Returns
+    -------
+    The value returned by the function.
+    """
+    return await run_in("default", func, *args, **kwargs)
+
+
+async def render(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking plotting function in the pool of rendering workers.
+    """
+    return await run_in("render", func, *args, **kwargs)
+
+
+async def run_in(pool: Pool, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking function in the given worker pool without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    if EXECUTOR_KIND != "process":
+        return await loop.run_in_executor(
+            get_executor(pool),
+            partial(func, *args, **kwargs),
+        )
+
+    executor = get_executor(pool)
+    try:
+        result, pid, stats = await loop.run_in_executor(
+            executor,
+            partial(_call_and_report, func, *args, **kwargs),
+        )
+    except BrokenProcessPool:
+        discard_broken(pool, executor)
+        raise
+    _worker_stats[pid] = stats
+    _retire_exited_workers()
+    return result
+
+
+def _call_and_report(func: Callable, *args, **kwargs) -> tuple[Any, int, dict]:
+    """
+    Call a function in a worker process and return its result together with the
+    statistics of the caches in that process.
+    """
+    return func(*args, **kwargs), os.getpid(), cache.stats()
+
+
+def _retire_exited_workers():
+    """
+    Fold the counters of worker processes which are no longer part of any pool into the
+    retired totals and forget their entries and bytes.
+    """
+    live = {
+        pid
+        for executor in _executors.values()
+        for pid in getattr(executor, "_processes", None) or {}
+    }
+    for pid in [pid for pid in _worker_stats if pid not in live]:
+        stats = _worker_stats.pop(pid)
+        counters = {
+            name: {key: value for key, value in values.items() if key not in GAUGES}
+            for name, values in stats.items()
+        }
+        merged = _merge_stats([_retired_stats, counters])
+        _retired_stats.clear()
+        _retired_stats.update(merged)
+
+
+def _merge_stats(all_stats: list[dict[str, dict]]) -> dict[str, dict]:
+    merged = {}
+    for stats in all_stats:
+        for name, counters in stats.items():
+            total = merged.setdefault(name, dict.fromkeys(counters, 0))
+            for key, value in counters.items():
+                total[key] = total.get(key, 0) + value
+    return merged
+
+
+async def get_cache_stats() -> dict[str, dict]:
+    """
+    Get the hit, miss and eviction counters of the caches used by the tools, summed over
+    the server and every worker process it has used, and the number of concurrent
+    identical calls merged into a single computation for each tool.
+
+    The entries and bytes held by a cache are only summed over the server and the
+    worker processes still running.
+
+    Returns
+    -------
+    A dictionary mapping each cache name, or 'single_flight.' followed by a tool name,
+    to its counters.
+    """
+    _retire_exited_workers()
+    return {
+        **_merge_stats([cache.stats(), _retired_stats, *_worker_stats.values()]),
+        **single_flight.stats(),
+    }
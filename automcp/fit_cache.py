@@ -0,0 +1,142 @@
+import json
+import logging
+from pathlib import Path
+
+from automcp import config
+from automcp.cache import canonical_hash, write_json
+
+log = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = Path(
+    config.env_str(
+        "AUTOMCP_FIT_CACHE_DIR",
+        str(Path.home() / ".cache" / "automcp" / "fits"),
+    )
+)
+
+# The number of recent fits of each dataset kept as starting points for similar models
+START_POINTS = config.env_int("AUTOMCP_FIT_START_POINTS", 16)
+
+
+def _result_path(model_dict: dict, dataset_hash: str, settings: dict) -> Path:
+    key = canonical_hash(
+        {"model": model_dict, "dataset": dataset_hash, "settings": settings}
+    )
+    return CACHE_DIRECTORY / "results" / f"{key}.json"
+
+
+def _start_path(dataset_hash: str, settings: dict) -> Path:
+    key = canonical_hash({"dataset": dataset_hash, "settings": settings})
+    return CACHE_DIRECTORY / "starts" / f"{key}.json"
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable fit cache entry %s: %s", path, e)
+        return None
+
+
+def _write(path: Path, record: dict):
+    try:
+        write_json(path, record)
+    except OSError as e:
+        log.warning("Could not write fit cache entry %s: %s", path, e)
+
+
+def lookup(model_dict: dict, dataset_hash: str, settings: dict) -> str | None:
+    """
+    Find the output directory of an earlier fit of the same model to the same dataset.
+
+    Parameters
+    ----------
+    model_dict
+        The model, with types added by add_type.
+    dataset_hash
+        The content hash of the dataset.
+    settings
+        The settings of the fit which change its result, e.g. the pixel scale.
+
+    Returns
+    -------
+    The output directory, or None if there is no earlier fit or its output has been
+    deleted.
+    """
+    record = _read(_result_path(model_dict, dataset_hash, settings))
+    if record is None or not Path(record["output_path"]).exists():
+        return None
+    return record["output_path"]
+
+
+def start_point(
+    prior_paths: list[str], dataset_hash: str, settings: dict
+) -> dict[str, float] | None:
+    """
+    Find the best fit parameters of a recent fit to the same dataset of the model
+    sharing the most free parameters, which are a good starting point for a similar
+    model. Of equally good matches the latest is used.
+
+    Parameters
+    ----------
+    prior_paths
+        The dot separated paths of the priors of the model.
+    dataset_hash
+        The content hash of the dataset.
+    settings
+        The settings of the fit which change its result.
+
+    Returns
+    -------
+    A dictionary mapping each prior path of the earlier model to its best fit value, or
+    None if no recent fit shares any free parameters.
+    """
+    records = _read(_start_path(dataset_hash, settings)) or {"fits": []}
+    prior_paths = set(prior_paths)
+    best, best_overlap = None, 0
+    # Records are newest first, so ties keep the latest
+    for fit in records["fits"]:
+        overlap = len(prior_paths.intersection(fit["parameters"]))
+        if overlap > best_overlap:
+            best, best_overlap = fit["parameters"], overlap
+    return best
+
+
+def record(
+    model_dict: dict,
+    dataset_hash: str,
+    settings: dict,
+    output_path: str,
+    parameters: dict[str, float],
+):
+    """
+    Record a completed fit so it can be reused by identical fits and used as a starting
+    point by similar ones.
+
+    Parameters
+    ----------
+    model_dict
+        The model, with types added by add_type.
+    dataset_hash
+        The content hash of the dataset.
+    settings
+        The settings of the fit which change its result.
+    output_path
+        The directory where the results are stored.
+    parameters
+        A dictionary mapping each prior path to its best fit value.
+    """
+    _write(
+        _result_path(model_dict, dataset_hash, settings),
+        {"output_path": output_path},
+    )
+    # Concurrent fits of one dataset may each miss the other's record, which only
+    # loses a starting point
+    start_path = _start_path(dataset_hash, settings)
+    records = _read(start_path) or {"fits": []}
+    fits = [{"output_path": output_path, "parameters": parameters}]
+    fits += [fit for fit in records["fits"] if fit["output_path"] != output_path]
+    _write(start_path, {"fits": fits[:START_POINTS]})
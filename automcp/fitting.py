@@ -0,0 +1,258 @@
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+import autolens as al
+import autofit as af
+
+from autoconf.dictable import from_dict
+
+from automcp import config, fit_cache
+from automcp.cache import LRUCache, canonical_hash
+from automcp.dataset import content_hash, imaging_nbytes, prepare_imaging
+from automcp.jobs import JobProgress
+from automcp.optimisation import add_type, fit_settings
+
+# Entries are (dataset, analysis), so an analysis is rebuilt when its dataset is reloaded
+# or prepared again. Each entry keeps its dataset alive, even once the dataset cache has
+# evicted it, so the cache is bounded by the size of the datasets too, by default to the
+# same size as the dataset cache.
+analysis_cache = LRUCache(
+    "analysis",
+    maxsize=config.env_int("AUTOMCP_ANALYSIS_CACHE_SIZE", 8),
+    maxbytes=config.env_int(
+        "AUTOMCP_ANALYSIS_CACHE_MB",
+        config.env_int("AUTOMCP_DATASET_CACHE_MB", 1024),
+    )
+    * 1024**2,
+    sizeof=lambda entry: imaging_nbytes(entry[0]),
+)
+
+# The progress of the fit running on each thread. Cached analyses are shared between
+# fits, so the progress cannot be an attribute of the analysis.
+_local = threading.local()
+
+
+@contextmanager
+def reporting_to(progress: JobProgress | None):
+    """
+    Report likelihood evaluations made on this thread to progress while in the context.
+    """
+    previous = getattr(_local, "progress", None)
+    _local.progress = progress
+    try:
+        yield
+    finally:
+        _local.progress = previous
+
+
+class ProgressAnalysis(al.AnalysisImaging):
+    """
+    An imaging analysis which reports every likelihood evaluation to the progress of the
+    fit running on the current thread, if any.
+    """
+
+    def log_likelihood_function(self, instance):
+        log_likelihood = super().log_likelihood_function(instance)
+        progress = getattr(_local, "progress", None)
+        if progress is not None:
+            progress.update(log_likelihood)
+        return log_likelihood
+
+
+def get_analysis(dataset_path: str, settings: dict) -> ProgressAnalysis:
+    """
+    Get an analysis of the imaging dataset in a directory, reusing one built by an
+    earlier fit in this process if the dataset and settings are unchanged.
+
+    The analysis is shared between fits so it must not be modified.
+
+    Parameters
+    ----------
+    dataset_path
+        The path to a directory containing the dataset files.
+    settings
+        The fields of the DatasetOptions describing how the dataset is prepared.
+    """
+    dataset = prepare_imaging(dataset_path, settings)
+    key = (str(Path(dataset_path).resolve()), canonical_hash(settings))
+
+    entry = analysis_cache.get(key)
+    if entry is not None and entry[0] is dataset:
+        return entry[1]
+
+    analysis = ProgressAnalysis(dataset=dataset)
+    analysis_cache.put(key, (dataset, analysis))
+    return analysis
+
+
+def _fit(
+    name: str,
+    dataset_path: str,
+    model: af.AbstractPriorModel,
+    settings: dict,
+    progress: JobProgress | None = None,
+    initializer: af.AbstractInitializer | None = None,
+) -> af.Result:
+    analysis = get_analysis(dataset_path, settings)
+
+    # The output directory only depends on the name and model, so fits of different
+    # data, or of a dataset prepared differently, are kept apart by a tag
+    unique_tag = f"dataset_{content_hash(dataset_path)[:8]}"
+    if settings != fit_settings():
+        unique_tag += f"_{canonical_hash(settings)[:8]}"
+
+    search = af.LBFGS(
+        name=name,
+        path_prefix="mcp",
+        unique_tag=unique_tag,
+        initializer=initializer,
+    )
+
+    if progress is not None:
+        options = getattr(search, "config_dict_options", {})
+        progress.start(budget=options.get("maxfun"))
+
+    with reporting_to(progress):
+        return search.fit(model, analysis)
+
+
+def _prior_path(path: tuple) -> str:
+    return ".".join(map(str, path))
+
+
+def _start_initializer(
+    model: af.AbstractPriorModel, parameters: dict[str, float]
+) -> af.InitializerParamStartPoints | None:
+    """
+    An initializer starting at the best fit parameters of a similar model, matched by
+    prior path. Parameters the earlier model did not have, or whose best fit is outside
+    the limits of this model's priors, are left to the initializer's default.
+    """
+    start = {}
+    for path, prior in model.path_priors_tuples:
+        value = parameters.get(_prior_path(path))
+        if value is not None and prior.lower_limit < value < prior.upper_limit:
+            start[prior] = value
+    return af.InitializerParamStartPoints(start) if start else None
+
+
+def fit(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    dataset_options: dict | None = None,
+    progress: JobProgress | None = None,
+) -> str:
+    """
+    Fit a model to an imaging dataset with LBFGS.
+
+    If the same model has been fitted to a dataset with the same contents before, the
+    earlier result is returned without fitting. Otherwise, if a model sharing free
+    parameters has recently been fitted to the dataset, the search starts from its best
+    fit for those parameters.
+
+    Parameters
+    ----------
+    name
+        The name of the search.
+    dataset_path
+        The path to a directory containing the dataset files.
+    model_json
+        A JSON describing the model.
+    dataset_options
+        The fields of a DatasetOptions describing how to crop, bin, mask and over-sample
+        the dataset. The whole dataset is fitted by default.
+    progress
+        If given, likelihood evaluations are reported to it and the fit stops when its
+        job is cancelled.
+
+    Returns
+    -------
+    The directory where the results are stored.
+    """
+    model_dict = add_type(model_json)
+    dataset_hash = content_hash(dataset_path)
+    settings = fit_settings(dataset_options)
+
+    output_path = fit_cache.lookup(model_dict, dataset_hash, settings)
+    if output_path is not None:
+        return output_path
+
+    model = from_dict(model_dict)
+    prior_paths = [_prior_path(path) for path in model.paths]
+
+    initializer = None
+    parameters = fit_cache.start_point(prior_paths, dataset_hash, settings)
+    if parameters is not None:
+        initializer = _start_initializer(model, parameters)
+
+    result = _fit(
+        name,
+        dataset_path,
+        model,
+        settings,
+        progress=progress,
+        initializer=initializer,
+    )
+    output_path = str(result.paths.output_path)
+
+    best_fit = result.samples.max_log_likelihood(as_instance=False)
+    fit_cache.record(
+        model_dict,
+        dataset_hash,
+        settings,
+        output_path,
+        dict(zip(prior_paths, map(float, best_fit))),
+    )
+    return output_path
+
+
+def fit_start(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    seed: int,
+    dataset_options: dict | None = None,
+) -> dict:
+    """
+    Fit a model to an imaging dataset with LBFGS, starting from a point drawn from the
+    priors of the model.
+
+    Parameters
+    ----------
+    name
+        The name of the search, which must differ between starts.
+    dataset_path
+        The path to a directory containing the dataset files.
+    model_json
+        A JSON describing the model.
+    seed
+        The seed of the random starting point.
+    dataset_options
+        The fields of a DatasetOptions describing how to prepare the dataset.
+
+    Returns
+    -------
+    A summary of the fit with its output directory and maximum log likelihood.
+    """
+    # Prior draws may come from either random number generator depending on the prior
+    random.seed(seed)
+    np.random.seed(seed)
+    model = from_dict(add_type(model_json))
+    result = _fit(
+        name,
+        dataset_path,
+        model,
+        fit_settings(dataset_options),
+        initializer=af.InitializerPrior(),
+    )
+    return {
+        "name": name,
+        "seed": seed,
+        "output_path": str(result.paths.output_path),
+        "log_likelihood": float(max(result.samples.log_likelihood_list)),
+    }
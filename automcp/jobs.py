@@ -0,0 +1,282 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Literal
+
+from automcp import config, execution
+
+MAX_RUNNING = config.env_int("AUTOMCP_MAX_FITS", 1)
+QUEUE_SIZE = config.env_int("AUTOMCP_JOB_QUEUE_SIZE", 32)
+JOB_HISTORY = config.env_int("AUTOMCP_JOB_HISTORY", 1000)
+
+# Seconds between progress updates sent from a worker to the server
+PROGRESS_INTERVAL = 1.0
+
+JobStatus = Literal[
+    "queued",
+    "running",
+    "cancelling",
+    "completed",
+    "failed",
+    "cancelled",
+]
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a worker when the job it is running has been cancelled.
+    """
+
+
+class JobProgress:
+    """
+    Progress of a job as seen from inside the worker running it.
+
+    The state is held in a multiprocessing manager so that it can be read by the server
+    while the worker is running. Updates are throttled so that reporting costs almost
+    nothing per likelihood evaluation.
+    """
+
+    def __init__(self, state, cancel_event):
+        self._state = state
+        self._cancel_event = cancel_event
+        self._evaluations = 0
+        self._best_log_likelihood = None
+        self._last_update = 0.0
+
+    def start(self, budget: int | None = None):
+        """
+        Record that the job has started in the worker.
+
+        Parameters
+        ----------
+        budget
+            The maximum number of evaluations the job will perform, if known.
+        """
+        self._last_update = time.monotonic()
+        self._state.update(
+            {
+                "started": time.time(),
+                "budget": budget,
+            }
+        )
+        self.check_cancelled()
+
+    def update(self, log_likelihood: float):
+        """
+        Record a single evaluation of the likelihood.
+
+        Raises
+        ------
+        JobCancelled
+            If the job has been cancelled since the last update.
+        """
+        self._evaluations += 1
+        best = self._best_log_likelihood
+        if best is None or log_likelihood > best:
+            self._best_log_likelihood = float(log_likelihood)
+
+        now = time.monotonic()
+        if now - self._last_update < PROGRESS_INTERVAL:
+            return
+        self._last_update = now
+
+        self._state.update(
+            {
+                "evaluations": self._evaluations,
+                "best_log_likelihood": self._best_log_likelihood,
+                "updated": time.time(),
+            }
+        )
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    func: Callable
+    args: tuple
+    state: Any
+    cancel_event: Any
+    status: JobStatus = "queued"
+    submitted: float = field(default_factory=time.time)
+    finished: float | None = None
+    result: Any = None
+    error: str | None = None
+
+    def describe(self) -> dict:
+        state = dict(self.state)
+        started = state.get("started")
+        evaluations = state.get("evaluations", 0)
+        budget = state.get("budget")
+
+        elapsed = None
+        eta = None
+        if started is not None:
+            elapsed = (self.finished or time.time()) - started
+            if self.status == "running" and evaluations and budget:
+                # An upper bound; optimisers usually converge before using their budget
+                eta = max(budget - evaluations, 0) * elapsed / evaluations
+
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": started,
+            "finished": self.finished,
+            "elapsed_seconds": elapsed,
+            "evaluations": evaluations,
+            "best_log_likelihood": state.get("best_log_likelihood"),
+            "eta_seconds": eta,
+            "output_path": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs long jobs in the background in a dedicated pool of worker processes.
+
+    Jobs wait in a bounded queue and at most `max_running` run at once. Job functions
+    are called in a worker with a `progress` keyword argument holding a `JobProgress`.
+    """
+
+    def __init__(self, max_running: int, queue_size: int):
+        self.max_running = max_running
+        self.queue_size = queue_size
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def _start(self):
+        if self._queue is not None:
+            return
+        context = multiprocessing.get_context(execution.START_METHOD)
+        self._manager = context.Manager()
+        self._executor = self._create_executor()
+        # Unbounded, as cancelled jobs stay in the queue until a dispatcher skips them.
+        # submit bounds the number of jobs still waiting instead.
+        self._queue = asyncio.Queue()
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.max_running)
+        ]
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_running,
+            mp_context=multiprocessing.get_context(execution.START_METHOD),
+            initializer=execution._warm_worker,
+        )
+
+    def _replace_broken(self, executor: ProcessPoolExecutor):
+        """
+        Replace the pool after one of its workers died, e.g. killed for running out of
+        memory, as a broken pool fails every later job.
+        """
+        if self._executor is executor:
+            self._executor = self._create_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                progress = JobProgress(job.state, job.cancel_event)
+                executor = self._executor
+                try:
+                    job.result = await loop.run_in_executor(
+                        executor,
+                        partial(job.func, *job.args, progress=progress),
+                    )
+                    job.status = "completed"
+                except JobCancelled:
+                    job.status = "cancelled"
+                except BrokenProcessPool as e:
+                    self._replace_broken(executor)
+                    job.status = "failed"
+                    job.error = f"The worker running the job died: {e}"
+                except Exception as e:
+                    job.status = "failed"
+                    job.error = f"{type(e).__name__}: {e}"
+                job.finished = time.time()
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.finished is not None]
+        for job in finished[: max(len(finished) - JOB_HISTORY, 0)]:
+            del self._jobs[job.id]
+
+    def submit(self, name: str, func: Callable, *args) -> str:
+        """
+        Queue a job and return its id straight away.
+
+        Raises
+        ------
+        RuntimeError
+            If the queue is full.
+        """
+        self._start()
+        self._prune()
+
+        # Only jobs still waiting count, so cancelled jobs free their place straight away
+        queued = sum(other.status == "queued" for other in self._jobs.values())
+        if queued >= self.queue_size:
+            raise RuntimeError(
+                f"The job queue is full ({self.queue_size} jobs); try again later."
+            )
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            name=name,
+            func=func,
+            args=args,
+            state=self._manager.dict(),
+            cancel_event=self._manager.Event(),
+        )
+        self._queue.put_nowait(job)
+        self._jobs[job.id] = job
+        return job.id
+
+    def get(self, job_id: str) -> Job:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise ValueError(f"No job with id {job_id}.")
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancel a job. A queued job is cancelled immediately and a running job stops at
+        its next progress update.
+        """
+        job = self.get(job_id)
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished = time.time()
+        elif job.status == "running":
+            job.status = "cancelling"
+            job.cancel_event.set()
+        return job
+
+    def all(self) -> list[Job]:
+        return list(self._jobs.values())
+
+
+job_manager = JobManager(max_running=MAX_RUNNING, queue_size=QUEUE_SIZE)
@@ -0,0 +1,115 @@
+from typing import Literal
+
+import numpy as np
+
+from automcp import config
+from automcp.cache import LRUCache
+from automcp.schema import UniformGrid2D
+
+LensingMap = Literal[
+    "deflections_y",
+    "deflections_x",
+    "convergence",
+    "potential",
+    "magnification",
+]
+MAPS: tuple[LensingMap, ...] = (
+    "deflections_y",
+    "deflections_x",
+    "convergence",
+    "potential",
+    "magnification",
+)
+
+deflections_cache = LRUCache(
+    "deflections",
+    maxbytes=config.env_int("AUTOMCP_DEFLECTIONS_CACHE_MB", 256) * 1024**2,
+    sizeof=lambda deflections: deflections.nbytes,
+)
+
+
+def deflections_from(key: str, mass, grid: UniformGrid2D) -> np.ndarray:
+    """
+    The deflections of a mass profile, galaxy or tracer on a uniform grid as an array of
+    shape (*shape_native, 2), reusing the deflections computed by an earlier call with
+    the same key and grid.
+
+    Parameters
+    ----------
+    key
+        A key identifying the mass, e.g. a hash of its arguments.
+    mass
+        The object whose deflections are computed.
+    grid
+        The uniform grid the deflections are computed on.
+    """
+
+    def compute() -> np.ndarray:
+        deflections = mass.deflections_yx_2d_from(grid=grid.instance).array
+        deflections = deflections.reshape(*grid.shape_native, 2)
+        deflections.flags.writeable = False
+        return deflections
+
+    cache_key = (key, tuple(grid.shape_native), float(grid.pixel_scales))
+    return deflections_cache.get_or_create(cache_key, compute)
+
+
+def lensing_maps_from(
+    key: str,
+    mass,
+    grid: UniformGrid2D,
+    maps: list[LensingMap] | tuple[LensingMap, ...] = MAPS,
+) -> dict[str, np.ndarray]:
+    """
+    Compute lensing maps of a mass profile, galaxy or tracer on a uniform grid from a
+    single evaluation of its deflections.
+
+    The convergence and magnification are derived from the Jacobian of the lens mapping,
+    which is found by finite differences of the deflections. They are accurate away from
+    the edges of the grid and from singularities such as the centre of a cuspy profile.
+    The potential is computed directly.
+
+    Parameters
+    ----------
+    key
+        A key identifying the mass, used to reuse its deflections between calls.
+    mass
+        The object whose lensing maps are computed.
+    grid
+        The uniform grid the maps are computed on.
+    maps
+        The maps to compute.
+
+    Returns
+    -------
+    A dictionary mapping the name of each map to an array of shape shape_native.
+    """
+    for name in maps:
+        if name not in MAPS:
+            raise ValueError(f"Unknown lensing map {name!r}; must be one of {MAPS}.")
+
+    result = {}
+    if any(name != "potential" for name in maps):
+        deflections = deflections_from(key, mass, grid)
+        deflections_y = deflections[..., 0]
+        deflections_x = deflections[..., 1]
+        result["deflections_y"] = deflections_y
+        result["deflections_x"] = deflections_x
+
+        # Rows of a native array run from the top of the grid down, so y decreases by
+        # one pixel scale per row
+        pixel_scale = float(grid.pixel_scales)
+        dy_dy, dy_dx = np.gradient(deflections_y, -pixel_scale, pixel_scale)
+        dx_dy, dx_dx = np.gradient(deflections_x, -pixel_scale, pixel_scale)
+
+        result["convergence"] = 0.5 * (dy_dy + dx_dx)
+        determinant = (1.0 - dx_dx) * (1.0 - dy_dy) - dx_dy * dy_dx
+        with np.errstate(divide="ignore"):
+            result["magnification"] = 1.0 / determinant
+
+    if "potential" in maps:
+        result["potential"] = mass.potential_2d_from(
+            grid=grid.instance
+        ).array.reshape(grid.shape_native)
+
+    return {name: result[name] for name in maps}
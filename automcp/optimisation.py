@@ -1,15 +1,23 @@
+import asyncio
 import json
+from typing import List
 
 from mcp.server import FastMCP
-import autolens as al
-import autofit as af
-from pathlib import Path
 
-from autoconf.dictable import from_dict
+from automcp import execution, fit_cache
+from automcp.dataset import content_hash
+from automcp.jobs import JobProgress, job_manager
+from automcp.schema import DatasetOptions
 
 
 def add(mcp: FastMCP):
     mcp.tool()(optimise)
+    mcp.tool()(optimise_multistart)
+    mcp.tool()(optimise_batch)
+    mcp.tool()(submit_optimise)
+    mcp.tool()(get_job_status)
+    mcp.tool()(list_jobs)
+    mcp.tool()(cancel_job)
 
 
 def add_type(model_dict):
@@ -27,10 +35,26 @@ def add_type(model_dict):
     return model_dict
 
 
+def fit_settings(dataset_options: DatasetOptions | dict | None = None) -> dict:
+    """
+    The settings of a fit, other than its model and dataset, which change its result.
+
+    These are the fields of the DatasetOptions, with defaults filled in.
+    """
+    return DatasetOptions.model_validate(dataset_options or {}).model_dump()
+
+
+def _cached_output_path(
+    dataset_path: str, model_json: dict, settings: dict
+) -> str | None:
+    return fit_cache.lookup(add_type(model_json), content_hash(dataset_path), settings)
+
+
 async def optimise(
     name: str,
     dataset_path: str,
     model_json: dict,
+    dataset_options: DatasetOptions | None = None,
 ) -> str:
     """
     Run a non-linear optimisation on the given dataset using the model specified in the JSON file.
@@ -43,23 +67,265 @@ async def optimise(
         The path to a directory containing the dataset files.
     model_json
         A JSON describing the model to be used for optimisation.
+    dataset_options
+        How to crop, bin, mask and over-sample the dataset before fitting it. Fitting only the central
+        arc-seconds of a large image is much faster. The whole dataset is fitted by default.
+
+    Returns
+    -------
+    The directory where the optimisation results are stored. If the same model has already been fitted to the
+    same data, the directory of the earlier optimisation is returned straight away.
+    """
+    settings = fit_settings(dataset_options)
+    output_path = await asyncio.to_thread(
+        _cached_output_path, dataset_path, model_json, settings
+    )
+    if output_path is not None:
+        return output_path
+    return await execution.run(_optimise, name, dataset_path, model_json, settings)
+
+
+def _optimise(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    dataset_options: dict | None = None,
+    progress: JobProgress | None = None,
+) -> str:
+    # Imported here as autolens is slow to import and only needed in the worker
+    from automcp.fitting import fit
+
+    return fit(name, dataset_path, model_json, dataset_options, progress=progress)
+
+
+def _optimise_start(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    seed: int,
+    dataset_options: dict | None = None,
+) -> dict:
+    from automcp.fitting import fit_start
+
+    return fit_start(name, dataset_path, model_json, seed, dataset_options)
+
+
+def _error(exception: BaseException) -> str:
+    return f"{type(exception).__name__}: {exception}"
+
+
+async def optimise_multistart(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    starts: int = 4,
+    seed: int = 0,
+    dataset_options: DatasetOptions | None = None,
+) -> dict:
+    """
+    Run several non-linear optimisations of the same model from different random starting points in parallel
+    and return the best, which is less likely to be stuck in a local maximum than a single optimisation.
+
+    Parameters
+    ----------
+    name
+        The name of the optimisation task. Each start is named after it with the seed of the start appended.
+    dataset_path
+        The path to a directory containing the dataset files.
+    model_json
+        A JSON describing the model to be used for optimisation.
+    starts
+        The number of optimisations to run. Each one starts from a point drawn from the priors of the model.
+    seed
+        The seed of the first start. Start i uses seed + i, so repeating a call reproduces its starting points.
+    dataset_options
+        How to crop, bin, mask and over-sample the dataset before fitting it. Fitting only the central
+        arc-seconds of a large image is much faster. The whole dataset is fitted by default.
+
+    Returns
+    -------
+    The summary of the start with the highest log likelihood under 'best', and the output directory,
+    log likelihood or error of every start under 'starts'.
+    """
+    if starts < 1:
+        raise ValueError("starts must be at least 1.")
+
+    settings = fit_settings(dataset_options)
+    # The starting point is not part of a search's identity, so the seed is put in the
+    # name. The dataset is identified by the tag every fit is given.
+    seeds = [seed + index for index in range(starts)]
+    results = await asyncio.gather(
+        *(
+            execution.run(
+                _optimise_start,
+                f"{name}_seed_{start_seed}",
+                dataset_path,
+                model_json,
+                start_seed,
+                settings,
+            )
+            for start_seed in seeds
+        ),
+        return_exceptions=True,
+    )
+    summaries = [
+        (
+            {
+                "name": f"{name}_seed_{start_seed}",
+                "seed": start_seed,
+                "error": _error(result),
+            }
+            if isinstance(result, BaseException)
+            else result
+        )
+        for start_seed, result in zip(seeds, results)
+    ]
+    completed = [summary for summary in summaries if "error" not in summary]
+    if not completed:
+        raise RuntimeError(f"Every start failed: {summaries[0]['error']}")
+
+    return {
+        "best": max(completed, key=lambda summary: summary["log_likelihood"]),
+        "starts": summaries,
+    }
+
+
+async def optimise_batch(
+    name: str,
+    dataset_paths: List[str],
+    model_json: dict,
+    dataset_options: DatasetOptions | None = None,
+) -> list[dict]:
+    """
+    Run non-linear optimisations of the same model on several datasets in parallel.
+
+    Parameters
+    ----------
+    name
+        The name of the optimisation task. Each dataset's optimisation is named after it with a hash of the
+        dataset's contents appended.
+    dataset_paths
+        The paths to directories containing the dataset files.
+    model_json
+        A JSON describing the model to be used for optimisation.
+    dataset_options
+        How to crop, bin, mask and over-sample the dataset before fitting it. Fitting only the central
+        arc-seconds of a large image is much faster. The whole dataset is fitted by default.
+
+    Returns
+    -------
+    For each dataset, the directory where its optimisation results are stored or the error which stopped it.
+    """
+    settings = fit_settings(dataset_options)
+    hashes = await asyncio.gather(
+        *(asyncio.to_thread(content_hash, path) for path in dataset_paths),
+        return_exceptions=True,
+    )
+
+    # Searches are named by the contents of their dataset rather than its position in
+    # the list, so repeating a batch with other datasets never reuses another dataset's
+    # search. Datasets with the same contents share one fit.
+    fits = {}
+    for dataset_path, dataset_hash in zip(dataset_paths, hashes):
+        if not isinstance(dataset_hash, BaseException) and dataset_hash not in fits:
+            fits[dataset_hash] = asyncio.ensure_future(
+                execution.run(
+                    _optimise,
+                    f"{name}_{dataset_hash[:8]}",
+                    dataset_path,
+                    model_json,
+                    settings,
+                )
+            )
+    await asyncio.gather(*fits.values(), return_exceptions=True)
+
+    results = []
+    for dataset_path, dataset_hash in zip(dataset_paths, hashes):
+        if isinstance(dataset_hash, BaseException):
+            error = dataset_hash
+        else:
+            error = fits[dataset_hash].exception()
+        if error is not None:
+            result = {"error": _error(error)}
+        else:
+            result = {"output_path": fits[dataset_hash].result()}
+        results.append({"dataset_path": dataset_path} | result)
+    return results
+
+
+async def submit_optimise(
+    name: str,
+    dataset_path: str,
+    model_json: dict,
+    dataset_options: DatasetOptions | None = None,
+) -> str:
+    """
+    Submit a non-linear optimisation to run in the background and return its job id straight away.
+
+    Use get_job_status to follow its progress and find its output directory once it completes.
+
+    Parameters
+    ----------
+    name
+        The name of the optimisation task.
+    dataset_path
+        The path to a directory containing the dataset files.
+    model_json
+        A JSON describing the model to be used for optimisation.
+    dataset_options
+        How to crop, bin, mask and over-sample the dataset before fitting it. Fitting only the central
+        arc-seconds of a large image is much faster. The whole dataset is fitted by default.
 
     Returns
     -------
-    The directory where the optimisation results are stored.
-    """
-    dataset_path = Path(dataset_path)
-    dataset = al.Imaging.from_fits(
-        data_path=dataset_path / "data.fits",
-        noise_map_path=dataset_path / "noise_map.fits",
-        psf_path=dataset_path / "psf.fits",
-        pixel_scales=0.1,
+    The id of the job.
+    """
+    return job_manager.submit(
+        name,
+        _optimise,
+        name,
+        dataset_path,
+        model_json,
+        fit_settings(dataset_options),
     )
 
-    analysis = al.AnalysisImaging(dataset=dataset)
-    search = af.LBFGS(name=name, path_prefix="mcp")
-    model = from_dict(add_type(model_json))
 
-    result = search.fit(model, analysis)
+async def get_job_status(job_id: str) -> dict:
+    """
+    Get the status and progress of a background optimisation.
+
+    Parameters
+    ----------
+    job_id
+        The id returned by submit_optimise.
+
+    Returns
+    -------
+    A dictionary with the status ('queued', 'running', 'cancelling', 'completed', 'failed' or 'cancelled'),
+    the number of likelihood evaluations so far, the best log likelihood found, an upper bound on the
+    seconds remaining and the output directory.
+    """
+    return job_manager.get(job_id).describe()
+
+
+async def list_jobs() -> list[dict]:
+    """
+    Get the status and progress of every background optimisation.
+    """
+    return [job.describe() for job in job_manager.all()]
+
+
+async def cancel_job(job_id: str) -> dict:
+    """
+    Cancel a background optimisation. A running optimisation stops within a few seconds.
 
-    return result.paths.output_path
+    Parameters
+    ----------
+    job_id
+        The id returned by submit_optimise.
+
+    Returns
+    -------
+    The status of the job after cancelling.
+    """
+    return job_manager.cancel(job_id).describe()
@@ -1,3 +1,4 @@
+import importlib
 import inspect
 import operator
 from functools import lru_cache, reduce
@@ -26,6 +27,9 @@ def _freeze(obj: Any) -> Any:
         return obj  # assume already hashable
 
 
+_DEFAULT_CONFIG_KEY = _freeze({"arbitrary_types_allowed": True})
+
+
 @lru_cache(maxsize=None)
 def _base_for_cached(cls: type, config_key: tuple) -> type:
     """
@@ -63,11 +67,21 @@ def pydantic_from_class(
     - Adds a Literal discriminator field (name=DISCRIMINATOR) for discriminated unions.
     - Extracts field types from `__init__` annotations and defaults from the signature.
     """
+    if not extra_config:
+        return _model_for_cached(cls, _DEFAULT_CONFIG_KEY)
+
     # Normalize and freeze config so it can be used as a cache key
-    ec = extra_config or {}
     # Always enforce arbitrary_types_allowed=True, but allow overrides to be supplied as well
-    config_key = _freeze({"arbitrary_types_allowed": True, **ec})
+    config_key = _freeze({"arbitrary_types_allowed": True, **extra_config})
 
+    return _model_for_cached(cls, config_key)
+
+
+@lru_cache(maxsize=None)
+def _model_for_cached(cls: type, config_key: tuple) -> type[BaseModel]:
+    """
+    Cached factory for the model of *cls*, so each model is only generated once per process.
+    """
     DynamicBase = _base_for_cached(cls, config_key)
 
     # Collect fields from __init__
@@ -119,3 +133,35 @@ def make_discriminated_union(classes: list[type]):
 
     union = reduce(operator.or_, model_types[1:], model_types[0])
     return models, Annotated[union, Field(discriminator=DISCRIMINATOR)]
+
+
+def model_arguments(model: BaseModel) -> tuple[str, dict[str, Any]]:
+    """
+    Split an instance of a generated model into the fully qualified path of the class it
+    wraps and the arguments needed to construct that class.
+
+    Unlike the generated model, the returned values can be pickled and sent to a worker process.
+    """
+    arguments = {
+        name: getattr(model, name)
+        for name in type(model).model_fields
+        if name != DISCRIMINATOR
+    }
+    return getattr(model, DISCRIMINATOR), arguments
+
+
+def instance_from_arguments(class_path: str, arguments: dict[str, Any]) -> Any:
+    """
+    Construct an instance of the plain class at *class_path* from its arguments.
+
+    This is the inverse of `model_arguments`.
+    """
+    return class_from_path(class_path)(**arguments)
+
+
+def class_from_path(class_path: str) -> type:
+    """
+    Import the class at the fully qualified *class_path*, e.g. the discriminator of a model.
+    """
+    module_name, _, class_name = class_path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)
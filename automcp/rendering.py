@@ -0,0 +1,92 @@
+import io
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+
+import autolens.plot as aplt
+
+from automcp.schema import ImageOptions
+
+# The resolution used for thumbnails
+THUMBNAIL_DPI = 40
+
+
+def savefig_kwargs(options: ImageOptions) -> dict:
+    """
+    Keyword arguments for `plt.savefig` which render a figure as described by options.
+    """
+    pil_kwargs = {}
+    if options.format == "png" and options.compress_level is not None:
+        pil_kwargs["compress_level"] = options.compress_level
+    if options.format in ("jpeg", "webp") and options.quality is not None:
+        pil_kwargs["quality"] = options.quality
+
+    dpi = THUMBNAIL_DPI if options.thumbnail else options.dpi
+    return {
+        "format": options.format,
+        "dpi": dpi or "figure",
+        "bbox_inches": "tight",
+        "pil_kwargs": pil_kwargs or None,
+    }
+
+
+class BufferOutput(aplt.Output):
+    """
+    An output which saves every figure plotted with it to an in-memory image instead of
+    writing it to disk.
+    """
+
+    def __init__(self, options: ImageOptions | None = None):
+        super().__init__(format="png")
+        self.options = options or ImageOptions()
+        self.images: list[bytes] = []
+
+    def _save(self):
+        buffer = io.BytesIO()
+        plt.savefig(buffer, **savefig_kwargs(self.options))
+        self.images.append(buffer.getvalue())
+
+    def to_figure(self, structure=None, auto_filename=None):
+        self._save()
+
+    def subplot_to_figure(self, auto_filename=None):
+        self._save()
+
+
+# Plotting configuration reused across renders in this process, keyed by tool
+_mat_plots: dict[str, aplt.MatPlot2D] = {}
+
+
+def warm():
+    """
+    Prepare a rendering worker process so that its first render is as fast as later ones.
+
+    Importing this module selects the Agg backend and imports autolens.plot. Rendering a
+    throwaway figure loads the fonts and builds the canvas machinery.
+    """
+    figure = plt.figure()
+    figure.text(0.5, 0.5, "automcp")
+    figure.savefig(io.BytesIO(), format="png")
+    plt.close(figure)
+
+
+def mat_plot_2d(name: str, options: ImageOptions | None = None) -> aplt.MatPlot2D:
+    """
+    A MatPlot2D which is built once per process and reused for every render with the
+    same name, saving to a new in-memory output each time.
+
+    Parameters
+    ----------
+    name
+        Identifies the tool rendering with it, so tools do not share plot settings.
+    options
+        How the figures are rendered.
+    """
+    mat_plot = _mat_plots.get(name)
+    if mat_plot is None:
+        mat_plot = _mat_plots[name] = aplt.MatPlot2D()
+    mat_plot.output = BufferOutput(options)
+    return mat_plot
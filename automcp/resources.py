@@ -1,17 +1,69 @@
-from typing import Literal
+import asyncio
+import difflib
+import inspect
+import logging
+import re
+import threading
+from typing import Annotated, Any, Literal
 
 from mcp.server import FastMCP
-import autolens as al
-from autoconf.dictable import to_dict
-from autogalaxy.profiles.mass import MassProfile
-from automcp.pydantic_wrapper import pydantic_from_class
+from pydantic import BaseModel, TypeAdapter, WithJsonSchema
+
+from automcp import schema_cache
+from automcp.pydantic_wrapper import (
+    DISCRIMINATOR,
+    class_from_path,
+    make_discriminated_union,
+    pydantic_from_class,
+)
+
+log = logging.getLogger(__name__)
 
 
 def add(mcp: FastMCP):
     mcp.add_tool(get_profile_example)
+    mcp.add_tool(get_all_profile_examples)
     mcp.add_tool(get_profile_info)
 
 
+# Weights of a query token matching each part of a class in the search index
+NAME_WEIGHT = 10.0
+PARAMETER_WEIGHT = 3.0
+DOCSTRING_WEIGHT = 1.0
+# Score for the query appearing in a class name, as the old substring search matched
+SUBSTRING_SCORE = 20.0
+EXACT_SCORE = 100.0
+# Multiplier for tokens which only match approximately
+FUZZY_WEIGHT = 0.5
+FUZZY_CUTOFF = 0.75
+
+
+def _name_tokens(name: str) -> list[str]:
+    """
+    Split a CamelCase or snake_case name into lower case words, e.g.
+    'NFWTruncatedSph' -> ['nfw', 'truncated', 'sph'].
+    """
+    return [
+        token.lower()
+        for token in re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+", name)
+    ]
+
+
+def _text_tokens(text: str) -> list[str]:
+    return [token for token in re.findall(r"[a-z]+", text.lower()) if len(token) > 2]
+
+
+def _parameter_names(cls: type) -> list[str]:
+    try:
+        return [
+            name
+            for name in inspect.signature(cls.__init__).parameters
+            if name not in ("self", "args", "kwargs")
+        ]
+    except (TypeError, ValueError):
+        return []
+
+
 class ProfileFinder:
     def __init__(self, root_cls):
         self._classes = []
@@ -23,22 +75,99 @@ class ProfileFinder:
 
         add_class(root_cls)
 
-    def find(self, name) -> list[type]:
+        self._names = [cls.__name__ for cls in self._classes]
+        self._lower_names = [name.lower() for name in self._names]
+
+        # Inverted index from token to the weight it contributes to each class
+        self._index: dict[str, dict[int, float]] = {}
+        for i, cls in enumerate(self._classes):
+            weights = {}
+            for token in _text_tokens(cls.__doc__ or ""):
+                weights[token] = DOCSTRING_WEIGHT
+            for parameter in _parameter_names(cls):
+                for token in [parameter.lower(), *_name_tokens(parameter)]:
+                    weights[token] = max(weights.get(token, 0.0), PARAMETER_WEIGHT)
+            for token in [cls.__name__.lower(), *_name_tokens(cls.__name__)]:
+                weights[token] = NAME_WEIGHT
+            for token, weight in weights.items():
+                self._index.setdefault(token, {})[i] = weight
+        self._vocabulary = list(self._index)
+
+    def _token_matches(self, token: str) -> list[tuple[str, float]]:
+        if token in self._index:
+            return [(token, 1.0)]
+        return [
+            (match, FUZZY_WEIGHT)
+            for match in difflib.get_close_matches(
+                token, self._vocabulary, n=3, cutoff=FUZZY_CUTOFF
+            )
+        ]
+
+    def search(self, query: str, limit: int | None = None) -> list[type]:
+        """
+        Find profile classes matching a query, most relevant first.
+
+        The query is matched against class names, `__init__` parameter names and
+        docstrings, by whole words and approximately to allow for typos.
+
+        Parameters
+        ----------
+        query
+            One or more words, e.g. 'isothermal' or 'elliptical power law'. An empty
+            query matches every class, ordered by name.
+        limit
+            The maximum number of classes to return.
+
+        Returns
+        -------
+        list[type]
+            The matching profile classes, ordered by relevance.
+        """
+        query = query.strip()
+        lower_query = query.lower()
+        scores: dict[int, float] = {}
+
+        if not lower_query:
+            # Every name contains the empty string, so every class matches
+            ranked = sorted(range(len(self._names)), key=lambda i: self._names[i])
+            return [self._classes[i] for i in ranked[:limit]]
+
+        for i, name in enumerate(self._lower_names):
+            if name == lower_query:
+                scores[i] = scores.get(i, 0.0) + EXACT_SCORE
+            elif lower_query in name:
+                scores[i] = scores.get(i, 0.0) + SUBSTRING_SCORE
+
+        for token in {*_text_tokens(query), *_name_tokens(query)}:
+            # A class scores for its best match of each query token
+            token_scores: dict[int, float] = {}
+            for match, weight in self._token_matches(token):
+                for i, token_weight in self._index[match].items():
+                    score = weight * token_weight
+                    token_scores[i] = max(token_scores.get(i, 0.0), score)
+            for i, score in token_scores.items():
+                scores[i] = scores.get(i, 0.0) + score
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], self._names[i]))
+        return [self._classes[i] for i in ranked[:limit]]
+
+    def find(self, name, limit: int | None = None) -> list[type]:
         """
-        Find a profile class by its name.
+        Find profile classes by name, most relevant first.
 
         Parameters
         ----------
         name : str
-            The name of the profile class to find.
+            The name, or part of the name, of the profile class to find.
+        limit
+            The maximum number of classes to return.
 
         Returns
         -------
-        type
-            The profile class if found, otherwise None.
+        list[type]
+            The matching profile classes, ordered by relevance.
         """
-        name = name.strip().lower()
-        return [cls for cls in self._classes if name in cls.__name__.lower()]
+        return self.search(name, limit=limit)
 
     @property
     def all_names(self) -> list[str]:
@@ -50,7 +179,7 @@ class ProfileFinder:
         list[str]
             A list of all profile class names.
         """
-        return [cls.__name__ for cls in self._classes]
+        return self._names
 
     @property
     def all_classes(self) -> list[type]:
@@ -65,8 +194,202 @@ class ProfileFinder:
         return self._classes
 
 
-light_profile_finder = ProfileFinder(al.LightProfile)
-mass_profile_finder = ProfileFinder(MassProfile)
+_finders: dict[str, ProfileFinder] = {}
+_finders_lock = threading.Lock()
+
+
+def get_finder(profile_type: Literal["light", "mass"]) -> ProfileFinder:
+    """
+    Get the finder for light or mass profiles.
+
+    Finders are built on first use because doing so imports autolens, which is too slow
+    to do while the server starts.
+    """
+    if profile_type not in ("light", "mass"):
+        raise ValueError("profile_type must be either 'light' or 'mass'.")
+
+    with _finders_lock:
+        if profile_type not in _finders:
+            _finders[profile_type] = ProfileFinder(_root_class(profile_type))
+        return _finders[profile_type]
+
+
+def _root_class(profile_type: Literal["light", "mass"]) -> type:
+    """
+    The class every light or mass profile derives from.
+    """
+    if profile_type == "light":
+        import autolens as al
+
+        return al.LightProfile
+
+    from autogalaxy.profiles.mass import MassProfile
+
+    return MassProfile
+
+
+_unions: dict[str, tuple[dict[type, type[BaseModel]], Any]] = {}
+_adapters: dict[str, TypeAdapter] = {}
+_unions_lock = threading.Lock()
+
+
+def get_profile_union(
+    profile_type: Literal["light", "mass"],
+) -> tuple[dict[type, type[BaseModel]], Any]:
+    """
+    Get the generated Pydantic models and the discriminated union of every light or
+    mass profile, building them on first use.
+
+    Returns
+    -------
+    A dictionary mapping each profile class to its model, and the union type.
+    """
+    finder = get_finder(profile_type)
+    with _unions_lock:
+        if profile_type not in _unions:
+            models, union = make_discriminated_union(finder.all_classes)
+            _adapters[profile_type] = TypeAdapter(union)
+            _unions[profile_type] = models, union
+            _cache_union_schema(profile_type, _adapters[profile_type])
+        return _unions[profile_type]
+
+
+def _cache_union_schema(profile_type: Literal["light", "mass"], adapter: TypeAdapter):
+    """
+    Persist the JSON schema of a profile union so that later processes can describe
+    profile arguments without building the union.
+    """
+    name = f"{profile_type}_profile"
+    if schema_cache.load(name) is not None:
+        return
+    try:
+        schema = adapter.json_schema()
+    except Exception as e:
+        log.warning("Could not generate the JSON schema of %s: %s", name, e)
+        return
+    schema_cache.save(name, schema_cache.self_contained(schema))
+
+
+def profile_argument_type(profile_type: Literal["light", "mass"]) -> Any:
+    """
+    The type of a tool argument taking a light or mass profile as a dictionary.
+
+    If the JSON schema of the profile union has been cached by an earlier process it is
+    used to describe the argument, so clients see every profile's fields without the
+    union being built at start-up. Otherwise the argument is described as an object.
+    The argument should be validated with `parse_profile`.
+    """
+    schema = schema_cache.load(f"{profile_type}_profile")
+    if schema is None:
+        return dict
+    return Annotated[dict, WithJsonSchema(schema)]
+
+
+def parse_profile(profile_type: Literal["light", "mass"], data: dict) -> BaseModel:
+    """
+    Validate a dictionary describing a light or mass profile.
+
+    The class named by the discriminator is imported and the dictionary validated
+    against its own model, so only that model is generated. The union of every profile
+    model is only built to report the error when the discriminator is missing or unknown.
+    """
+    profile_class = _profile_class(profile_type, data.get(DISCRIMINATOR))
+    model = None
+    if profile_class is not None:
+        try:
+            model = pydantic_from_class(profile_class)
+        except Exception:
+            # The union skips classes whose model cannot be built, so it reports them
+            pass
+    if model is not None:
+        return model.model_validate(data)
+
+    get_profile_union(profile_type)
+    return _adapters[profile_type].validate_python(data)
+
+
+def _profile_class(
+    profile_type: Literal["light", "mass"], class_path: Any
+) -> type | None:
+    """
+    The light or mass profile class at class_path, or None if there is no such profile.
+    """
+    root_class = _root_class(profile_type)
+    # Only modules of the package defining the profiles are imported from a payload
+    package = root_class.__module__.partition(".")[0]
+    if not isinstance(class_path, str) or not class_path.startswith(f"{package}."):
+        return None
+    try:
+        profile_class = class_from_path(class_path)
+    except (ImportError, AttributeError, ValueError):
+        return None
+    if not isinstance(profile_class, type) or not issubclass(profile_class, root_class):
+        return None
+    # The discriminator of a model is the module and name of its class, so a class
+    # imported under another path, e.g. a re-export, is left to the union to reject
+    if f"{profile_class.__module__}.{profile_class.__name__}" != class_path:
+        return None
+    return profile_class
+
+
+_examples: dict[str, dict[type, dict]] = {}
+# Classes which cannot be built without arguments, with the reason
+_unbuildable: dict[str, dict[type, str]] = {}
+_examples_lock = threading.Lock()
+
+
+def get_examples(profile_type: Literal["light", "mass"]) -> dict[type, dict]:
+    """
+    Get an example dictionary for every light or mass profile class that can be built
+    with its default arguments, computing them all on first use.
+
+    Classes that cannot be built are recorded in `_unbuildable` and never retried.
+    """
+    finder = get_finder(profile_type)
+    with _examples_lock:
+        if profile_type not in _examples:
+            from autoconf.dictable import to_dict
+
+            examples = {}
+            unbuildable = {}
+            for profile_class in finder.all_classes:
+                try:
+                    examples[profile_class] = to_dict(profile_class())
+                except Exception as e:
+                    # Skip classes that cannot be instantiated without arguments
+                    unbuildable[profile_class] = f"{type(e).__name__}: {e}"
+            if unbuildable:
+                log.debug(
+                    "Skipping %s profiles without default arguments: %s",
+                    profile_type,
+                    ", ".join(cls.__name__ for cls in unbuildable),
+                )
+            _examples[profile_type] = examples
+            _unbuildable[profile_type] = unbuildable
+        return _examples[profile_type]
+
+
+def warm():
+    """
+    Build the profile finders and examples so that the first request using them does not
+    wait. Intended to be run in a background thread once the server has started.
+
+    Profiles are validated without the unions, so a union is only built if its JSON
+    schema has not been cached for these package versions yet.
+    """
+    for profile_type in ("light", "mass"):
+        if schema_cache.load(f"{profile_type}_profile") is None:
+            get_profile_union(profile_type)
+        get_examples(profile_type)
+
+
+def __getattr__(name):
+    # light_profile_finder and mass_profile_finder are built on first access
+    if name == "light_profile_finder":
+        return get_finder("light")
+    if name == "mass_profile_finder":
+        return get_finder("mass")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def get_profile_info(profile_type: Literal["light", "mass"]) -> list[dict]:
@@ -83,12 +406,7 @@ async def get_profile_info(profile_type: Literal["light", "mass"]) -> list[dict]
     list[str]
         A list of profile class names.
     """
-    if profile_type == "light":
-        finder = light_profile_finder
-    elif profile_type == "mass":
-        finder = mass_profile_finder
-    else:
-        raise ValueError("profile_type must be either 'light' or 'mass'.")
+    finder = get_finder(profile_type)
 
     return [
         {
@@ -102,6 +420,7 @@ async def get_profile_info(profile_type: Literal["light", "mass"]) -> list[dict]
 async def get_profile_example(
     search_string: str,
     profile_type: Literal["light", "mass"],
+    limit: int = 10,
 ) -> list[dict]:
     """
     Search for example instances of a mass or light profile based on a search string and profile type.
@@ -112,36 +431,52 @@ async def get_profile_example(
     Parameters
     ----------
     search_string
-        A search string to filter profile names.
+        A name, part of a name or a few words describing the profile, e.g. 'sersic' or 'power law'.
     profile_type : str
         The type of the profile ('light' or 'mass').
+    limit
+        The maximum number of profiles to return examples of.
 
     Returns
     -------
     Examples
-        A list of dictionaries representing example instances of profiles that match the search string.
+        A list of dictionaries representing example instances of profiles that match the search string,
+        most relevant first.
     """
-    if profile_type == "light":
-        finder = light_profile_finder
-    elif profile_type == "mass":
-        finder = mass_profile_finder
-    else:
-        raise ValueError("profile_type must be either 'light' or 'mass'.")
+    finder = get_finder(profile_type)
+    examples = await asyncio.to_thread(get_examples, profile_type)
+
+    profile_classes = [
+        profile_class
+        for profile_class in finder.find(search_string)
+        if profile_class in examples
+    ]
 
-    profile_classes = finder.find(search_string)
+    return [examples[profile_class] for profile_class in profile_classes[:limit]]
 
-    output = []
 
-    for profile_class in profile_classes:
-        try:
-            profile_instance = profile_class()
-        except TypeError as e:
-            # Skip classes that cannot be instantiated without arguments
-            print(f"Skipping {profile_class.__name__}: {e}")
-            continue
-        output.append(to_dict(profile_instance))
-
-    return output
+async def get_all_profile_examples(
+    profile_type: Literal["light", "mass"],
+) -> dict[str, dict]:
+    """
+    Get example instances of every mass or light profile in a single response.
+
+    Parameters
+    ----------
+    profile_type : str
+        The type of the profile ('light' or 'mass').
+
+    Returns
+    -------
+    Examples
+        A dictionary mapping the class path of each profile to a dictionary representing an
+        example instance of it.
+    """
+    examples = await asyncio.to_thread(get_examples, profile_type)
+    return {
+        f"{profile_class.__module__}.{profile_class.__qualname__}": example
+        for profile_class, example in examples.items()
+    }
 
 
 async def get_galaxy_example() -> list[dict]:
@@ -1,11 +1,36 @@
 from functools import cached_property
-from pydantic import BaseModel
+from typing import Literal
 
-import autolens as al
+from pydantic import BaseModel
 
 import pydantic
 
-from autoconf.dictable import from_dict
+from automcp import config
+from automcp.cache import LRUCache, canonical_hash
+
+grid_cache = LRUCache("grid", maxsize=config.env_int("AUTOMCP_GRID_CACHE_SIZE", 32))
+instance_cache = LRUCache(
+    "instance",
+    maxsize=config.env_int("AUTOMCP_INSTANCE_CACHE_SIZE", 256),
+)
+
+
+def _uniform_grid(shape_native: tuple[int, int], pixel_scales: float) -> "al.Grid2D":
+    import autolens as al
+
+    grid = al.Grid2D.uniform(
+        shape_native=shape_native,
+        pixel_scales=pixel_scales,
+    )
+    # Grids are shared between requests so must never be modified in place
+    grid.array.flags.writeable = False
+    return grid
+
+
+def _from_dict(component_dict: dict):
+    from autoconf.dictable import from_dict
+
+    return from_dict(component_dict)
 
 
 class UniformGrid2D(pydantic.BaseModel):
@@ -29,11 +54,12 @@ class UniformGrid2D(pydantic.BaseModel):
     def instance(self):
         """
         Create a uniform grid based on the shape and pixel scales.
+
+        Grids are shared through a process wide cache, so the same grid is only built
+        once. The returned grid is read-only.
         """
-        return al.Grid2D.uniform(
-            shape_native=self.shape_native,
-            pixel_scales=self.pixel_scales,
-        )
+        key = (tuple(self.shape_native), float(self.pixel_scales))
+        return grid_cache.get_or_create(key, lambda: _uniform_grid(*key))
 
 
 class Component(BaseModel):
@@ -44,15 +70,117 @@ class Component(BaseModel):
 
     @cached_property
     def instance(self):
-        return from_dict(
-            {
-                "type": self.type,
-                "class_path": self.class_path,
-                "arguments": self.arguments,
-            }
+        """
+        Build the object described by this component.
+
+        Built objects are shared through a process wide cache keyed by a hash of the
+        type, class path and arguments, so resending the same component skips
+        deserialisation. The returned object must not be modified.
+        """
+        component_dict = {
+            "type": self.type,
+            "class_path": self.class_path,
+            "arguments": self.arguments,
+        }
+        return instance_cache.get_or_create(
+            canonical_hash(component_dict),
+            lambda: _from_dict(component_dict),
         )
 
 
 class Instance(Component):
     class_path: str
     type: str = "instance"
+
+
+class ArrayOutput(BaseModel):
+    """
+    How a tool returns an array.
+
+    Attributes
+    ----------
+    encoding
+        'json' returns nested lists of numbers. 'npy' returns a base64 encoded .npy file and
+        'raw' returns the base64 encoded array buffer together with its shape and dtype.
+    dtype
+        The floating point precision the array is converted to before encoding.
+    compression
+        Compression applied to 'npy' and 'raw' encodings before base64 encoding.
+        'zstd' requires the zstandard package.
+    path
+        If given the array is written to this .npy file and only its path is returned.
+        '.npy' is appended if the path has a different suffix.
+    """
+
+    encoding: Literal["json", "npy", "raw"] = "json"
+    dtype: Literal["float64", "float32", "float16"] = "float64"
+    compression: Literal["none", "zlib", "zstd"] = "none"
+    path: str | None = None
+
+
+class ImageOptions(BaseModel):
+    """
+    How a tool renders an image.
+
+    Attributes
+    ----------
+    format
+        The image format.
+    dpi
+        The resolution of the image in dots per inch. The figure's own resolution by default.
+    quality
+        The quality of 'jpeg' and 'webp' images, from 1 to 100.
+    compress_level
+        The zlib compression level of 'png' images, from 0 to 9.
+    thumbnail
+        Render a small, low resolution image for a quick look.
+    """
+
+    format: Literal["png", "webp", "jpeg"] = "png"
+    dpi: int | None = None
+    quality: int | None = pydantic.Field(default=None, ge=1, le=100)
+    compress_level: int | None = pydantic.Field(default=None, ge=0, le=9)
+    thumbnail: bool = False
+
+
+class DatasetOptions(BaseModel):
+    """
+    How an imaging dataset is prepared before it is fitted.
+
+    Cropping, binning and masking reduce the number of pixels every likelihood
+    evaluation touches, so fits which only need the centre of the image run faster.
+
+    Attributes
+    ----------
+    pixel_scales
+        The arc-second size of each pixel of the dataset files.
+    crop_shape
+        Crop the image to this (rows, columns) shape about its centre.
+    bin_factor
+        Bin the image by this factor in each direction after cropping, averaging the
+        data and combining the noise in quadrature.
+    mask_radius
+        Fit only the pixels within this radius in arc-seconds of the centre.
+    mask_inner_radius
+        Also exclude the pixels within this radius, giving an annular mask. Requires
+        mask_radius.
+    over_sample_size
+        The size of the sub-grid used to evaluate light profiles in each pixel. The
+        library's adaptive default if not given.
+    """
+
+    pixel_scales: float = pydantic.Field(default=0.1, gt=0)
+    crop_shape: tuple[pydantic.PositiveInt, pydantic.PositiveInt] | None = None
+    bin_factor: int = pydantic.Field(default=1, ge=1)
+    mask_radius: float | None = pydantic.Field(default=None, gt=0)
+    mask_inner_radius: float | None = pydantic.Field(default=None, ge=0)
+    over_sample_size: int | None = pydantic.Field(default=None, ge=1)
+
+    @pydantic.model_validator(mode="after")
+    def check_mask(self) -> "DatasetOptions":
+        if self.mask_inner_radius is not None:
+            if self.mask_radius is None:
+                raise ValueError("mask_inner_radius requires mask_radius.")
+            if self.mask_inner_radius >= self.mask_radius:
+                raise ValueError("mask_inner_radius must be less than mask_radius.")
+        return self
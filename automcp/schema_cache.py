@@ -0,0 +1,101 @@
+import json
+import logging
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from automcp import config
+from automcp.cache import canonical_hash, write_json
+
+log = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = Path(
+    config.env_str(
+        "AUTOMCP_SCHEMA_CACHE_DIR",
+        str(Path.home() / ".cache" / "automcp" / "schemas"),
+    )
+)
+
+# Packages whose versions change the generated models or their JSON schemas
+VERSIONED_PACKAGES = ("autolens", "autogalaxy", "pydantic", "automcp")
+
+
+def _version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def versions() -> dict[str, str]:
+    """
+    The versions the cached schemas depend on.
+
+    The source of the model generator is included so that running from a checkout
+    without installing the package does not reuse stale schemas.
+    """
+    versions = {package: _version(package) for package in VERSIONED_PACKAGES}
+    wrapper_path = Path(__file__).parent / "pydantic_wrapper.py"
+    versions["pydantic_wrapper"] = canonical_hash(wrapper_path.read_text())
+    return versions
+
+
+def cache_path(name: str) -> Path:
+    """
+    The path of the cached schema with the given name for the installed versions.
+    """
+    return CACHE_DIRECTORY / canonical_hash(versions())[:16] / f"{name}.json"
+
+
+def load(name: str) -> dict | None:
+    """
+    Load a cached JSON schema, or return None if it has not been cached for the
+    installed versions.
+    """
+    try:
+        with open(cache_path(name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable schema cache %s: %s", name, e)
+        return None
+
+
+def save(name: str, schema: dict):
+    """
+    Atomically write a JSON schema to the cache.
+    """
+    try:
+        write_json(cache_path(name), schema)
+    except OSError as e:
+        log.warning("Could not write schema cache %s: %s", name, e)
+
+
+def self_contained(schema: dict) -> dict:
+    """
+    Inline every '#/$defs/...' reference of a JSON schema so it can be embedded inside
+    another schema.
+
+    Pydantic places the models of a union in a top level '$defs' section, which stops
+    meaning anything once the schema is nested in a tool's parameters.
+    """
+    definitions = schema.get("$defs", {})
+
+    def inline(value: Any) -> Any:
+        if isinstance(value, dict):
+            ref = value.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/$defs/"):
+                return inline(definitions[ref.removeprefix("#/$defs/")])
+            return {
+                key: inline(item)
+                for key, item in value.items()
+                if key != "$defs" and not (key == "mapping" and "propertyName" in value)
+            }
+        if isinstance(value, list):
+            return [inline(item) for item in value]
+        return value
+
+    return inline(schema)
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Literal
+
+from automcp import config
+from automcp.cache import file_signature
+
+INDEX_PATH = Path(
+    config.env_str(
+        "AUTOMCP_SEARCH_INDEX",
+        str(Path.home() / ".cache" / "automcp" / "searches.sqlite"),
+    )
+)
+
+# Files whose modification shows that a search's results have changed, relative to its directory
+SIGNATURE_PATHS = (
+    ".",
+    "metadata",
+    "files",
+    "files/samples_summary.json",
+    "files/samples.csv",
+)
+
+Field = Literal["name", "directory", "instance", "log_evidence"]
+FIELDS: tuple[Field, ...] = ("name", "directory", "instance", "log_evidence")
+SortBy = Literal["name", "directory", "log_evidence"]
+
+
+def find_search_directories(root: Path) -> Iterator[Path]:
+    """
+    Find the output directories of every search below root.
+    """
+    for directory, _, filenames in os.walk(root):
+        if "metadata" in filenames:
+            yield Path(directory)
+
+
+def signature(directory: Path) -> str:
+    """
+    A string which changes whenever the output of the search in directory changes.
+    """
+    paths = [directory / relative_path for relative_path in SIGNATURE_PATHS]
+    return json.dumps(file_signature(*paths))
+
+
+class SearchIndex:
+    """
+    A persistent SQLite index of the metadata of searches in output directories.
+
+    The index is updated incrementally: only searches whose files have changed since
+    they were last indexed are loaded again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS searches (
+                    directory TEXT PRIMARY KEY,
+                    name TEXT,
+                    instance TEXT,
+                    log_evidence REAL,
+                    signature TEXT NOT NULL,
+                    indexed REAL NOT NULL
+                )
+                """
+            )
+            self._connection.commit()
+        return self._connection
+
+    def stale(self, root: Path) -> tuple[list[Path], list[str]]:
+        """
+        Compare the index with the searches on disk below root.
+
+        Returns
+        -------
+        The directories of searches which are new or have changed, and the directories
+        of indexed searches which no longer exist.
+        """
+        prefix = str(root).rstrip(os.sep) + os.sep
+        with self._lock:
+            indexed = dict(
+                self.connection.execute(
+                    "SELECT directory, signature FROM searches "
+                    "WHERE directory = ? OR substr(directory, 1, ?) = ?",
+                    (str(root), len(prefix), prefix),
+                )
+            )
+
+        changed = []
+        for directory in find_search_directories(root):
+            if indexed.pop(str(directory), None) != signature(directory):
+                changed.append(directory)
+        return changed, list(indexed)
+
+    def update(self, searches: list[dict], removed: list[str]):
+        """
+        Store newly loaded searches and forget removed ones.
+
+        Parameters
+        ----------
+        searches
+            Dictionaries with the directory, signature, name, instance and log_evidence of
+            each search.
+        removed
+            The directories of searches to remove from the index.
+        """
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM searches WHERE directory = ?",
+                [(directory,) for directory in removed],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO searches "
+                "(directory, name, instance, log_evidence, signature, indexed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        search["directory"],
+                        search["name"],
+                        json.dumps(search["instance"]),
+                        search["log_evidence"],
+                        search["signature"],
+                        now,
+                    )
+                    for search in searches
+                ],
+            )
+
+    def query(
+        self,
+        root: Path,
+        name: str | None = None,
+        sort_by: SortBy | None = None,
+        descending: bool = True,
+        fields: list[Field] | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Query the indexed searches below root.
+
+        Parameters
+        ----------
+        root
+            The output directory containing the searches.
+        name
+            Only return searches whose name contains this string.
+        sort_by
+            The field to sort by. Searches are returned in directory order by default.
+        descending
+            Sort in descending order, e.g. highest evidence first.
+        fields
+            The fields to return for each search. All fields by default.
+        offset
+            The number of searches to skip.
+        limit
+            The maximum number of searches to return.
+        """
+        fields = list(fields or FIELDS)
+        for field in [*fields, sort_by or "directory"]:
+            if field not in FIELDS:
+                raise ValueError(f"Unknown field {field!r}; must be one of {FIELDS}.")
+
+        prefix = str(root).rstrip(os.sep) + os.sep
+        sql = (
+            f"SELECT {', '.join(fields)} FROM searches "
+            "WHERE (directory = ? OR substr(directory, 1, ?) = ?)"
+        )
+        parameters: list = [str(root), len(prefix), prefix]
+        if name is not None:
+            sql += " AND instr(name, ?) > 0"
+            parameters.append(name)
+        if sort_by is not None:
+            sql += f" ORDER BY {sort_by} {'DESC' if descending else 'ASC'}, directory"
+        else:
+            sql += " ORDER BY directory"
+        sql += " LIMIT ? OFFSET ?"
+        parameters += [-1 if limit is None else limit, offset]
+
+        with self._lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+
+        results = []
+        for row in rows:
+            result = dict(zip(fields, row))
+            if result.get("instance") is not None:
+                result["instance"] = json.loads(result["instance"])
+            results.append(result)
+        return results
+
+
+search_index = SearchIndex(INDEX_PATH)
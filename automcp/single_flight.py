@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from automcp import config
+from automcp.cache import canonical_hash
+
+# Tools listed in AUTOMCP_SINGLE_FLIGHT_DISABLED, separated by commas, always run their
+# own computation
+DISABLED = {
+    name.strip()
+    for name in config.env_str("AUTOMCP_SINGLE_FLIGHT_DISABLED", "").split(",")
+    if name.strip()
+}
+
+# The number of computations started and the number of calls merged into one already in
+# flight, for each tool
+_counters: dict[str, dict[str, int]] = {}
+
+
+def configure(tool: str, enabled: bool):
+    """
+    Enable or disable merging concurrent identical calls of a tool.
+    """
+    if enabled:
+        DISABLED.discard(tool)
+    else:
+        DISABLED.add(tool)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Stops asyncio warning about an unretrieved exception when every caller has gone
+    if not task.cancelled():
+        task.exception()
+
+
+def single_flight(func: Callable) -> Callable:
+    """
+    Make concurrent calls of an async tool with the same arguments share one computation.
+
+    A call made while an identical call is still running waits for that call and returns
+    its result, or raises its exception, rather than computing it again. Arguments are
+    compared by their canonical hash, so pydantic models with equal fields match.
+
+    The computation keeps running if the caller that started it is cancelled, so that
+    the callers sharing it still get a result.
+
+    The wrapper keeps the signature of the tool so FastMCP generates the same schema.
+    """
+    name = func.__name__
+    signature = inspect.signature(func)
+    in_flight: dict[str, asyncio.Task] = {}
+    counters = _counters.setdefault(name, {"computations": 0, "merged": 0})
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if name in DISABLED:
+            return await func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = canonical_hash(_canonical(bound.arguments))
+
+        task = in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+            task.add_done_callback(_retrieve_exception)
+            counters["computations"] += 1
+        else:
+            counters["merged"] += 1
+
+        return await asyncio.shield(task)
+
+    return wrapper
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """
+    The number of computations started and calls merged for each single flight tool.
+    """
+    return {
+        f"single_flight.{name}": dict(counters) for name, counters in _counters.items()
+    }
@@ -0,0 +1,178 @@
+import asyncio
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+
+from automcp import execution
+from automcp.encoding import npy_path
+from automcp.schema import Instance, UniformGrid2D
+
+Quantity = Literal["deflections", "image"]
+
+# Estimated peak bytes of temporaries per grid pixel while evaluating a quantity.
+# Images are evaluated on an over-sampled grid so need much more than deflections.
+BYTES_PER_PIXEL = {
+    "deflections": 512,
+    "image": 4096,
+}
+
+OUTPUT_DIRECTORY = Path(tempfile.gettempdir()) / "automcp"
+
+# The largest number of pixels along either side of a tiled image once it is reduced for
+# display. Plots are never shown at a higher resolution than this.
+DISPLAY_PIXELS = 2048
+
+
+def tile_rows_for(
+    shape_native: tuple[int, int],
+    quantity: Quantity,
+    max_memory_mb: int,
+) -> int:
+    """
+    The number of grid rows in each tile such that the tiles evaluated at the same time
+    by every worker fit within max_memory_mb.
+    """
+    bytes_per_row = shape_native[1] * BYTES_PER_PIXEL[quantity]
+    budget = max_memory_mb * 1024**2 // execution.MAX_WORKERS
+    return int(min(max(budget // bytes_per_row, 1), shape_native[0]))
+
+
+async def evaluate_tiled(
+    instance: Instance,
+    grid: UniformGrid2D,
+    quantity: Quantity,
+    max_memory_mb: int,
+    path: str | None = None,
+    dtype: str = "float64",
+) -> Path:
+    """
+    Evaluate the deflections or image of an instance on a uniform grid one tile of rows
+    at a time, streaming the result into a memory mapped .npy file.
+
+    Tiles are evaluated in parallel by the worker pool. Peak memory is bounded by
+    max_memory_mb whatever the size of the grid.
+
+    Parameters
+    ----------
+    instance
+        The mass profile, light profile, galaxy or tracer to evaluate.
+    grid
+        The uniform grid to evaluate on.
+    quantity
+        'deflections' or 'image'.
+    max_memory_mb
+        The approximate memory ceiling for the evaluation in megabytes.
+    path
+        The .npy file to write to, with '.npy' appended if it has a different suffix.
+        A new file in the temporary directory by default.
+    dtype
+        The floating point precision the result is stored with.
+
+    Returns
+    -------
+    The path of the .npy file. It holds an array of shape shape_native for images and
+    (*shape_native, 2) for deflections. A file created in the temporary directory is
+    only deleted if the evaluation fails, so the caller must delete it once done.
+    """
+    shape_native = tuple(grid.shape_native)
+    temporary = path is None
+    if temporary:
+        OUTPUT_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        path = OUTPUT_DIRECTORY / f"{quantity}_{uuid.uuid4().hex}.npy"
+    path = npy_path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    shape = shape_native if quantity == "image" else (*shape_native, 2)
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    del output
+
+    tile_rows = tile_rows_for(shape_native, quantity, max_memory_mb)
+    try:
+        await asyncio.gather(
+            *(
+                execution.run(
+                    _evaluate_tile,
+                    instance,
+                    shape_native,
+                    grid.pixel_scales,
+                    quantity,
+                    row_start,
+                    min(row_start + tile_rows, shape_native[0]),
+                    path,
+                )
+                for row_start in range(0, shape_native[0], tile_rows)
+            )
+        )
+    except BaseException:
+        if temporary:
+            path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def _evaluate_tile(
+    instance: Instance,
+    shape_native: tuple[int, int],
+    pixel_scales: float,
+    quantity: Quantity,
+    row_start: int,
+    row_stop: int,
+    path: Path,
+):
+    import autolens as al
+
+    rows = row_stop - row_start
+    # The tile is the uniform grid of its rows, centred where those rows sit in the full grid
+    origin_y = (shape_native[0] / 2 - (row_start + row_stop) / 2) * pixel_scales
+    grid = al.Grid2D.uniform(
+        shape_native=(rows, shape_native[1]),
+        pixel_scales=pixel_scales,
+        origin=(origin_y, 0.0),
+    )
+
+    if quantity == "image":
+        values = instance.instance.image_2d_from(grid=grid).array
+        values = values.reshape(rows, shape_native[1])
+    else:
+        values = instance.instance.deflections_yx_2d_from(grid=grid).array
+        values = values.reshape(rows, shape_native[1], 2)
+
+    output = np.load(path, mmap_mode="r+")
+    output[row_start:row_stop] = values
+    output.flush()
+
+
+def block_average(
+    path: Path, max_pixels: int = DISPLAY_PIXELS
+) -> tuple[np.ndarray, int]:
+    """
+    Load the image in a .npy file reduced so that neither side has more than max_pixels
+    pixels, by averaging square blocks of pixels.
+
+    The file is memory mapped and read one row of blocks at a time, so the full
+    resolution image is never held in memory.
+
+    Returns
+    -------
+    The reduced image and the number of pixels along each side of a block. The blocks
+    at the bottom and right edges are smaller if the image does not divide into whole
+    blocks.
+    """
+    image = np.load(path, mmap_mode="r")
+    factor = -(-max(image.shape) // max_pixels)
+    if factor == 1:
+        return np.array(image), factor
+
+    rows, columns = image.shape
+    column_starts = np.arange(0, columns, factor)
+    column_counts = np.diff(np.append(column_starts, columns))
+
+    reduced = np.empty((-(-rows // factor), len(column_starts)))
+    for index, row_start in enumerate(range(0, rows, factor)):
+        block_rows = image[row_start : row_start + factor]
+        sums = np.add.reduceat(block_rows.sum(axis=0, dtype=np.float64), column_starts)
+        reduced[index] = sums / (column_counts * len(block_rows))
+    return reduced, factor
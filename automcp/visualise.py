@@ -1,28 +1,29 @@
-from typing import Union, Annotated
+import asyncio
+import tempfile
+from functools import lru_cache
 
-import uuid
+import numpy as np
 
-from fastmcp import FastMCP
-from mcp.server.fastmcp import Image
+from mcp.server.fastmcp import FastMCP, Image
 
-import autolens as al
 from pathlib import Path
-import autolens.plot as aplt
-from automcp.pydantic_wrapper import pydantic_from_class, make_discriminated_union
-from automcp.resources import ProfileFinder
-from autogalaxy.profiles.mass import MassProfile
+from automcp import config, execution, resources, schema_cache, tiling
+from automcp.cache import DiskCache, canonical_hash
+from automcp.dataset import load_imaging
+from automcp.pydantic_wrapper import (
+    model_arguments,
+    instance_from_arguments,
+)
 
-from automcp.schema import UniformGrid2D, Instance
+# autolens and matplotlib are imported by the functions that run in workers so that
+# importing this module, and starting the server, stays fast.
+
+from automcp.schema import ImageOptions, UniformGrid2D, Instance
+from automcp.single_flight import single_flight
 
 
 def dataset_from_path(dataset_path: str):
-    dataset_path = Path(dataset_path)
-    return al.Imaging.from_fits(
-        data_path=dataset_path / "data.fits",
-        noise_map_path=dataset_path / "noise_map.fits",
-        psf_path=dataset_path / "psf.fits",
-        pixel_scales=0.1,
-    )
+    return load_imaging(dataset_path, pixel_scales=0.1)
 
 
 def add(mcp_server: FastMCP):
@@ -43,6 +44,12 @@ async def visualize_dataset(
     dataset_path
         The path to the dataset directory containing 'data.fits', 'noise_map.fits', and 'psf.fits'.
     """
+    await execution.render(_visualize_dataset, dataset_path)
+
+
+def _visualize_dataset(dataset_path: str):
+    import autolens.plot as aplt
+
     dataset = dataset_from_path(dataset_path)
     dataset_plotter = aplt.ImagingPlotter(dataset=dataset)
     dataset_plotter.figures_2d(data=True)
@@ -62,34 +69,74 @@ async def visualize_grid(
     title
         The title of the plot.
     """
+    await execution.render(_visualize_grid, grid, title)
+
+
+def _visualize_grid(grid: UniformGrid2D, title: str):
+    import autolens.plot as aplt
+
     grid = grid.instance
     grid_plotter = aplt.Grid2DPlotter(grid=grid)
     grid_plotter.set_title(title)
     grid_plotter.figure_2d()
 
 
-def _make_output():
-    filename = uuid.uuid4().hex[:6]
+render_cache = DiskCache(
+    "render",
+    directory=config.env_str(
+        "AUTOMCP_RENDER_CACHE_DIR",
+        str(Path(tempfile.gettempdir()) / "automcp" / "renders"),
+    ),
+    maxbytes=config.env_int("AUTOMCP_RENDER_CACHE_MB", 256) * 1024**2,
+    max_age=config.env_int("AUTOMCP_RENDER_CACHE_MAX_AGE", 24 * 60 * 60),
+)
 
-    return aplt.Output(
-        path=Path("/tmp"),
-        filename=filename,
-        format="png",
-    )
+
+@lru_cache(maxsize=None)
+def _render_versions() -> dict[str, str]:
+    """
+    The versions renders depend on besides their arguments, so that upgrading a package
+    or editing the plotting code does not reuse stale renders from the disk cache.
+    """
+    sources = [Path(__file__), Path(__file__).parent / "rendering.py"]
+    return {
+        **schema_cache.versions(),
+        "matplotlib": schema_cache._version("matplotlib"),
+        "plotting": canonical_hash([path.read_text() for path in sources]),
+    }
+
+
+def _render_key(tool: str, **arguments) -> str:
+    """
+    A content hash identifying a render, from the tool and everything that affects its output.
+    """
+    return canonical_hash({"tool": tool, "versions": _render_versions(), **arguments})
 
 
-light_profile_finder = ProfileFinder(al.LightProfile)
-mass_profile_finder = ProfileFinder(MassProfile)
+def _image_from(data: bytes, options: ImageOptions) -> Image:
+    return Image(data=data, format=options.format)
 
 
-PydanticLightProfile = make_discriminated_union(light_profile_finder.all_classes)
-PydanticMassProfile = make_discriminated_union(mass_profile_finder.all_classes)
+def __getattr__(name):
+    # The finders and profile unions are slow to build so are only built on first access
+    if name == "light_profile_finder":
+        return resources.get_finder("light")
+    if name == "mass_profile_finder":
+        return resources.get_finder("mass")
+    if name == "PydanticLightProfile":
+        return resources.get_profile_union("light")[1]
+    if name == "PydanticMassProfile":
+        return resources.get_profile_union("mass")[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
+@single_flight
 async def visualize_instance(
     instance: Instance,
     grid: UniformGrid2D,
     title: str = "Light Profile Visualization",
+    max_memory_mb: int | None = None,
+    image_options: ImageOptions | None = None,
 ):
     """
     Visualize a light profile, galaxy or tracer on a grid.
@@ -103,13 +150,71 @@ async def visualize_instance(
         Reasonable values for shape_native are (50, 50) with pixel_scales of 0.02.
     title
         The title of the plot.
+    max_memory_mb
+        If given the image is evaluated in tiles using roughly at most this much memory.
+        Use this for very large grids.
+    image_options
+        The format, resolution and compression of the image. Set thumbnail to get a small
+        image for a quick look.
     """
-    instance = instance.instance
-    image = instance.image_2d_from(grid=grid.instance)
-
-    output = _make_output()
-
-    mat_plot = aplt.MatPlot2D(output=output)
+    image_options = image_options or ImageOptions()
+    key = _render_key(
+        "visualize_instance",
+        instance=instance.model_dump(),
+        grid=grid.model_dump(),
+        title=title,
+        image_options=image_options.model_dump(),
+    )
+    cached = render_cache.get(key, f".{image_options.format}")
+    if cached is not None:
+        return Image(path=cached)
+
+    image_path = None
+    if max_memory_mb is not None:
+        image_path = await tiling.evaluate_tiled(instance, grid, "image", max_memory_mb)
+
+    try:
+        data = await execution.render(
+            _visualize_instance,
+            instance,
+            grid,
+            title,
+            key,
+            image_options,
+            image_path,
+        )
+    finally:
+        # The tiled image is as large as the grid and is only needed for this render
+        if image_path is not None:
+            image_path.unlink(missing_ok=True)
+    return _image_from(data, image_options)
+
+
+def _visualize_instance(
+    instance: Instance,
+    grid: UniformGrid2D,
+    title: str,
+    key: str,
+    image_options: ImageOptions,
+    image_path: Path | None = None,
+) -> bytes:
+    import autolens as al
+    import autolens.plot as aplt
+
+    from automcp import rendering
+
+    if image_path is None:
+        image = instance.instance.image_2d_from(grid=grid.instance)
+    else:
+        # The plot cannot show more pixels than the figure has, so the full resolution
+        # image is reduced to display resolution rather than loaded
+        values, factor = tiling.block_average(image_path)
+        image = al.Array2D.no_mask(
+            values=values,
+            pixel_scales=grid.pixel_scales * factor,
+        )
+
+    mat_plot = rendering.mat_plot_2d("visualize_instance", image_options)
 
     array_plotter = aplt.Array2DPlotter(
         array=image,
@@ -118,13 +223,19 @@ async def visualize_instance(
     array_plotter.set_title(title)
     array_plotter.figure_2d()
 
-    return Image(path=f"/tmp/{output.filename}.png")
+    data = mat_plot.output.images[-1]
+    render_cache.put(key, f".{image_options.format}", data)
+    return data
+
+
+MassProfileArgument = resources.profile_argument_type("mass")
 
 
 async def visualise_mass_profile(
-    mass_profile: PydanticMassProfile,
+    mass_profile: MassProfileArgument,
     grid: UniformGrid2D,
     title: str = "Mass Profile Visualization",
+    image_options: ImageOptions | None = None,
 ):
     """
     Visualize a mass profile on a grid.
@@ -132,33 +243,90 @@ async def visualise_mass_profile(
     Parameters
     ----------
     mass_profile
-        A mass profile to visualize.
+        A mass profile to visualize. Its arguments are given as fields alongside an
+        'automcp_model_type' field holding the fully qualified class path of the profile,
+        e.g. 'autogalaxy.profiles.mass.total.isothermal.Isothermal'.
     grid
         The grid to visualize, specified as a UniformGrid2D object with shape_native and pixel_scales.
         Reasonable values for shape_native are (50, 50) with pixel_scales of 0.02.
     title
         The title of the plot.
+    image_options
+        The format, resolution and compression of the image. Set thumbnail to get a small
+        image for a quick look.
 
     Returns
     -------
-    Displays the deflections of the mass profile on the specified grid.
+    An image of the magnification of the mass profile on the specified grid. Use
+    compute_lensing_maps to get its deflections, convergence and potential as arrays.
     """
-    output = _make_output()
+    image_options = image_options or ImageOptions()
+    # Validated here rather than by the tool signature so that the profile union is only
+    # built when first needed
+    mass_profile = await asyncio.to_thread(
+        resources.parse_profile,
+        "mass",
+        mass_profile,
+    )
+    class_path, arguments = model_arguments(mass_profile)
+    key = _render_key(
+        "visualise_mass_profile",
+        class_path=class_path,
+        arguments=arguments,
+        grid=grid.model_dump(),
+        title=title,
+        image_options=image_options.model_dump(),
+    )
+    cached = render_cache.get(key, f".{image_options.format}")
+    if cached is not None:
+        return Image(path=cached)
+
+    data = await execution.render(
+        _visualise_mass_profile,
+        class_path,
+        arguments,
+        grid,
+        title,
+        key,
+        image_options,
+    )
+    return _image_from(data, image_options)
 
-    mat_plot = aplt.MatPlot2D(output=output)
 
-    mass_profile_plotter = aplt.MassProfilePlotter(
-        mass_profile=mass_profile,
-        grid=grid.instance,
-        mat_plot_2d=mat_plot,
+def _visualise_mass_profile(
+    class_path: str,
+    arguments: dict,
+    grid: UniformGrid2D,
+    title: str,
+    key: str,
+    image_options: ImageOptions,
+) -> bytes:
+    import autolens as al
+    import autolens.plot as aplt
+
+    from automcp import rendering
+    from automcp.lensing import lensing_maps_from
+
+    mass_profile = instance_from_arguments(class_path, arguments)
+    # Only the magnification was ever returned, so the other maps are not plotted
+    lensing_maps = lensing_maps_from(
+        canonical_hash({"class_path": class_path, "arguments": arguments}),
+        mass_profile,
+        grid,
+        maps=("magnification",),
     )
-    mass_profile_plotter.figures_2d(
-        deflections_y=True,
-        deflections_x=True,
-        convergence=True,
-        potential=True,
-        magnification=True,
-        title_suffix=title,
+
+    mat_plot = rendering.mat_plot_2d("visualise_mass_profile", image_options)
+    array_plotter = aplt.Array2DPlotter(
+        array=al.Array2D.no_mask(
+            values=lensing_maps["magnification"],
+            pixel_scales=grid.pixel_scales,
+        ),
+        mat_plot_2d=mat_plot,
     )
+    array_plotter.set_title(f"Magnification {title}")
+    array_plotter.figure_2d()
 
-    return Image(path=f"/tmp/{output.filename}.png")
+    data = mat_plot.output.images[-1]
+    render_cache.put(key, f".{image_options.format}", data)
+    return data
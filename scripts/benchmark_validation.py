@@ -0,0 +1,124 @@
+"""
+Microbenchmark of the time spent parsing tool arguments per request.
+
+Measures validating every mass profile that can be built from its defaults through the
+whole discriminated union and through the model of the class named by its discriminator,
+and parsing a large tracer payload into an Instance and building it with and without the
+instance cache.
+
+    python scripts/benchmark_validation.py [number of galaxies]
+"""
+
+import sys
+import timeit
+
+from automcp import resources
+from automcp.pydantic_wrapper import DISCRIMINATOR
+from automcp.schema import Instance, instance_cache
+
+
+def mass_profile_payloads() -> list[dict]:
+    models, _ = resources.get_profile_union("mass")
+    payloads = []
+    for model in models.values():
+        fields = model.model_fields
+        if any(field.is_required() for field in fields.values()):
+            continue
+        payloads.append(
+            {name: field.default for name, field in fields.items()}
+            | {DISCRIMINATOR: fields[DISCRIMINATOR].default}
+        )
+    return payloads
+
+
+def tracer_payload(number_of_galaxies: int) -> dict:
+    def sersic(intensity):
+        return {
+            "type": "instance",
+            "class_path": "autogalaxy.profiles.light.standard.sersic.Sersic",
+            "arguments": {
+                "centre": {"type": "tuple", "values": [0.0, 0.0]},
+                "ell_comps": {"type": "tuple", "values": [0.0, 0.1]},
+                "intensity": intensity,
+                "effective_radius": 1.0,
+                "sersic_index": 2.5,
+            },
+        }
+
+    def isothermal(einstein_radius):
+        return {
+            "type": "instance",
+            "class_path": "autogalaxy.profiles.mass.total.isothermal.Isothermal",
+            "arguments": {
+                "centre": {"type": "tuple", "values": [0.0, 0.0]},
+                "ell_comps": {"type": "tuple", "values": [0.0, 0.1]},
+                "einstein_radius": einstein_radius,
+            },
+        }
+
+    return {
+        "type": "instance",
+        "class_path": "autolens.lens.tracer.Tracer",
+        "arguments": {
+            "galaxies": [
+                {
+                    "type": "instance",
+                    "class_path": "autogalaxy.galaxy.galaxy.Galaxy",
+                    "arguments": {
+                        "redshift": 0.5 + 0.01 * index,
+                        "bulge": sersic(1.0 + index),
+                        "mass": isothermal(1.0 + 0.1 * index),
+                    },
+                }
+                for index in range(number_of_galaxies)
+            ]
+        },
+    }
+
+
+def report(name: str, func, number: int, per: int = 1):
+    """
+    Print the best time of calling func, divided by the number of requests it makes.
+    """
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number / per
+    print(f"{name:<50} {seconds * 1e6:>12.1f} us")
+
+
+def main():
+    number_of_galaxies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    payloads = mass_profile_payloads()
+    adapter = resources._adapters["mass"]
+
+    print(f"{len(payloads)} mass profiles, time per request:")
+    report(
+        "union validation",
+        lambda: [adapter.validate_python(payload) for payload in payloads],
+        number=20,
+        per=len(payloads),
+    )
+    report(
+        "discriminator validation",
+        lambda: [resources.parse_profile("mass", payload) for payload in payloads],
+        number=20,
+        per=len(payloads),
+    )
+
+    tracer = tracer_payload(number_of_galaxies)
+    print(f"tracer with {number_of_galaxies} galaxies, time per request:")
+    report("Instance validation", lambda: Instance.model_validate(tracer), number=200)
+
+    def build_uncached():
+        instance_cache.clear()
+        return Instance.model_validate(tracer).instance
+
+    report("Instance validation and deserialisation", build_uncached, number=5)
+    report(
+        "Instance validation and cached deserialisation",
+        lambda: Instance.model_validate(tracer).instance,
+        number=200,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure how long the stdio server takes to answer the MCP initialize request.
+
+Exits with a non-zero status if the time exceeds the budget, which is one second by
+default and can be set with the AUTOMCP_STARTUP_BUDGET environment variable.
+
+    python scripts/startup_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BUDGET = float(os.environ.get("AUTOMCP_STARTUP_BUDGET", "1.0"))
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-time", "version": "0.0.0"},
+    },
+}
+
+
+def main() -> int:
+    server = Path(__file__).parent / "server.py"
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(server)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + "\n")
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        elapsed = time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+    if "result" not in response:
+        print(f"initialize failed: {response}")
+        return 1
+
+    print(f"initialize answered in {elapsed:.3f}s (budget {BUDGET:.3f}s)")
+    return 0 if elapsed <= BUDGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())